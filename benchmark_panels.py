@@ -0,0 +1,187 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# Times the draw callbacks of the sidebar panels per move number, e.g.
+#   blender -b --factory-startup --python benchmark_panels.py -- --games 3 --out panels.json
+# Plays seeded scripted games and writes one json result per game, ply and panel.
+# In background mode the piece types are placeholder cubes, their meshes don't take part in
+# drawing the panels, and the moves are applied to the game state and synced to the objects
+# since the transform operators need a viewport. With a viewport the move operators are used.
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import types
+
+import bpy
+import bmesh
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+addon = __import__(os.path.basename(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Layout():
+    # records nothing, stands in for UILayout so draw can run without a region
+    def row(self, *args, **kwargs):
+        return Layout()
+
+    def column(self, *args, **kwargs):
+        return Layout()
+
+    def operator(self, *args, **kwargs):
+        return types.SimpleNamespace()
+
+    def prop(self, *args, **kwargs):
+        pass
+
+    def label(self, *args, **kwargs):
+        pass
+
+    def separator(self, *args, **kwargs):
+        pass
+
+
+def build_types(context):
+    coll_types = bpy.data.collections.new("Types")
+    context.scene.collection.children.link(coll_types)
+    for color in range(2):
+        coll_color = bpy.data.collections.new(("Black", "White")[color])
+        coll_types.children.link(coll_color)
+        for index, name in enumerate(addon.engine.piece_names.values()):
+            mesh = bpy.data.meshes.new(name)
+            bm = bmesh.new()
+            bmesh.ops.create_cube(bm, size=1)
+            bm.to_mesh(mesh)
+            bm.free()
+            obj = bpy.data.objects.new(name, mesh)
+            coll_color.objects.link(obj)
+            obj.location = (index, 0, 0.35)
+            obj.scale = (0.34, 0.34, 0.34)
+            obj.hide_viewport = True
+
+
+def setup_scene(context, use_operators):
+    # takes over the current scene, run with --factory-startup
+    context.scene.name = "Dice Chess Benchmark"
+    if use_operators:
+        bpy.ops.rdc_game.builder(action='PIECES')
+    else:
+        build_types(context)
+    bpy.ops.rdc_game.board(action='RESET')
+    context.scene.rdc_game_is_setup = True
+
+
+def select(context, obj):
+    for other in context.selected_objects:
+        other.select_set(False)
+    context.view_layer.objects.active = obj
+    obj.select_set(True)
+
+
+def instruction(state, move):
+    index, actions = move
+    piece = state.pieces[index]
+    square = piece.square
+    squares = [square]
+    for action in actions:
+        delta = addon.engine.action_to_delta(piece.color, action)
+        square = (square[0] + delta[0], square[1] + delta[1])
+        squares.append(square)
+    return "".join(chr(x + 65) + str(y + 1) for x, y in squares)
+
+
+def play(context, state, move, use_operators):
+    index, actions = move
+    if use_operators:
+        for action in actions:
+            bpy.ops.object.rdc_game_piece(action=action)
+        return
+    state.play(move)
+    for index, piece in enumerate(state.pieces):
+        obj = addon.main.Board.get_object(context, state, index)
+        if piece.square is not None:
+            obj.location = (piece.square[0], piece.square[1], obj.location.z)
+        else:
+            obj.location = (piece.slot, addon.engine.tray_ranks[piece.color], obj.location.z)
+        addon.main.Piece.new(context, obj).sync(obj, piece)
+    context.scene.rdc_game_prev_active = state.pieces[state.prev_active].name
+    addon.main.bump_version(context.scene)
+
+
+def time_draw(panel, context, repeat):
+    owner = types.SimpleNamespace(layout=Layout())
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        panel.draw(owner, context)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def run(games, plies, repeat, seed, out):
+    context = bpy.context
+    use_operators = bpy.ops.transform.translate.poll()
+    setup_scene(context, use_operators)
+    panels = (addon.gui.RDC_PT_main, addon.tele.RDC_PT_tele)
+    totals = {panel.__name__: [] for panel in panels}
+    for game in range(games):
+        game_seed = "{0}:{1}".format(seed, game)
+        rand = random.Random(game_seed)
+        bpy.ops.rdc_game.board(action='RESET')
+        context.scene.seed = game_seed
+        bpy.ops.rdc_game.board(action='RANDOMIZE')
+        for ply in range(plies):
+            state = addon.main.Board.state(context)
+            moves = state.legal_moves(state.side_to_move())
+            if not moves:
+                break
+            move = rand.choice(moves)
+            # the player picked the piece and typed the move, draw as the sidebar would
+            select(context, addon.main.Board.get_object(context, state, move[0]))
+            context.scene.instr_import = instruction(state, move)
+            for panel in panels:
+                samples = time_draw(panel, context, repeat)
+                totals[panel.__name__].extend(samples)
+                out.write(json.dumps({
+                    "blender": bpy.app.version_string,
+                    "game": game,
+                    "ply": ply,
+                    "panel": panel.__name__,
+                    "median_us": statistics.median(samples) * 1e6,
+                    "mean_us": statistics.mean(samples) * 1e6,
+                    "max_us": max(samples) * 1e6,
+                    "pieces_on_board": sum(1 for piece in state.pieces if piece.square is not None),
+                }) + "\n")
+            play(context, state, move, use_operators)
+            if state.winner is not None:
+                break
+    for name, samples in totals.items():
+        print("{0:<16}{1:10.1f} us median{2:10.1f} us mean  over {3} draws".format(
+              name, statistics.median(samples) * 1e6, statistics.mean(samples) * 1e6, len(samples)))
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Time the Dice Chess panel draw callbacks")
+    parser.add_argument("--games", type=int, default=3)
+    parser.add_argument("--plies", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=20, help="draws timed per ply and panel")
+    parser.add_argument("--seed", default="0")
+    parser.add_argument("--out", default=None, help="json lines file, stdout if omitted")
+    args = parser.parse_args(argv)
+
+    if not hasattr(bpy.types.Scene, "rdc_game_is_setup"):
+        addon.register()
+    out = open(args.out, "w") if args.out else sys.stdout
+    try:
+        run(args.games, args.plies, args.repeat, args.seed, out)
+    finally:
+        if args.out:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
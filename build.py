@@ -1,6 +1,8 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+import hashlib
 import math
+import os
 
 import bpy
 from bpy.props import BoolProperty, EnumProperty, StringProperty
@@ -8,6 +10,14 @@ from bpy.types import Operator, Panel
 import bmesh
 import mathutils
 
+from . import bl_info
+
+
+dice_meshes = {}
+cache_collection = "Dice Chess Assets"
+# part of the library name, raised when the built assets change
+cache_format = 3
+
 
 class RDC_PT_build(Panel):
     bl_idname = 'GAME_PT_build'
@@ -87,6 +97,86 @@ class RDC_OT_build(Operator):
     }
 
     def scene(self, context):
+        path = self.cache_path()
+        if os.path.exists(path):
+            try:
+                self.append_scene(context, path)
+                return
+            except (OSError, RuntimeError, KeyError):
+                # unreadable cache, build and write it again
+                pass
+
+        objects = set(bpy.data.objects)
+        coll_types = self.build_scene(context)
+        try:
+            self.write_cache(context, path, coll_types,
+                             [obj for obj in bpy.data.objects if obj not in objects])
+        except (OSError, RuntimeError):
+            pass
+
+    def cache_path(self):
+        # keyed by add-on version and theme, a change of either builds a new library
+        theme = hashlib.sha1(repr(sorted(self.theme.items())).encode()).hexdigest()[:12]
+        directory = bpy.utils.user_resource('DATAFILES', path="dice_chess", create=True)
+        return os.path.join(directory, "assets_{0}_{1}_{2}.blend".format(
+                            ".".join(map(str, bl_info["version"])), cache_format, theme))
+
+    def write_cache(self, context, path, coll_types, objects):
+        assets = bpy.data.collections.new(cache_collection)
+        for obj in objects:
+            if obj.name in coll_types.all_objects:
+                continue
+            if obj.type == 'LIGHT' and obj.data.name == context.scene.rdc_game_light_ref:
+                obj["rdc_game_asset"] = "Light"
+            elif (obj.type == 'MESH' and
+                    context.scene.rdc_game_ground_ref in obj.data.materials.keys()):
+                obj["rdc_game_asset"] = "Ground"
+            assets.objects.link(obj)
+        assets.children.link(coll_types)
+
+        directory = os.path.dirname(path)
+        for name in os.listdir(directory):
+            if name.startswith("assets_") and name.endswith(".blend"):
+                os.remove(os.path.join(directory, name))
+        try:
+            bpy.data.libraries.write(path + ".tmp", {assets, context.scene.world}, fake_user=True)
+            os.replace(path + ".tmp", path)
+        finally:
+            bpy.data.collections.remove(assets)
+
+    def append_scene(self, context, path):
+        with bpy.data.libraries.load(path, link=False) as (data_from, data_to):
+            data_to.collections = [cache_collection]
+            world_names = data_from.worlds[:1]
+            # like new_world, reuse a world already in the file
+            data_to.worlds = [name for name in world_names if bpy.data.worlds.get(name) is None]
+        assets = data_to.collections[0]
+        if assets is None or len(assets.children) == 0:
+            # no assets or written without the piece types
+            for world in data_to.worlds:
+                if world is not None:
+                    world.use_fake_user = False
+            if assets is not None:
+                bpy.data.collections.remove(assets)
+            raise KeyError(cache_collection)
+        collection = context.view_layer.active_layer_collection.collection
+        for obj in assets.objects:
+            collection.objects.link(obj)
+            role = obj.get("rdc_game_asset")
+            if role == "Ground":
+                context.scene.rdc_game_ground_ref = obj.data.materials[0].name
+            elif role == "Light":
+                context.scene.rdc_game_light_ref = obj.data.name
+        for child in assets.children:
+            context.scene.collection.children.link(child)
+        bpy.data.collections.remove(assets)
+        if len(data_to.worlds) != 0:
+            context.scene.world = data_to.worlds[0]
+            context.scene.world.use_fake_user = False
+        elif len(world_names) != 0:
+            context.scene.world = bpy.data.worlds.get(world_names[0])
+
+    def build_scene(self, context):
         wm = context.window_manager
         progress = 2
         self.ground(context)
@@ -98,12 +188,13 @@ class RDC_OT_build(Operator):
         self.light(context)
         progress += 1
         wm.progress_update(progress)
-        self.pieces(context)
+        coll_types = self.pieces(context)
         progress += 1
         wm.progress_update(progress)
         self.world(context)
         progress += 1
         wm.progress_update(progress)
+        return coll_types
 
     def pieces(self, context):
         coll_types = bpy.data.collections.new("Types")
@@ -127,6 +218,7 @@ class RDC_OT_build(Operator):
                 obj.location = (index, 0, 0.35 + eps * bool(name == 'Queen'))
                 obj.scale = (0.34, 0.34, 0.34)
                 obj.hide_viewport = True
+        return coll_types
 
 
     def ground(self, context):
@@ -162,7 +254,9 @@ class RDC_OT_build(Operator):
                                                           shadow=False))
         obj_board.hide_select = True
 
+        # the 32 labels tessellated and joined into one mesh
         silver = self.new_material("Board_Nomination", shadow=False)
+        bm = bmesh.new()
         for color in range(2):
             for axis in range(2):
                 for square in range(8):
@@ -175,16 +269,26 @@ class RDC_OT_build(Operator):
                     curve.body = text
                     curve.size = 0.4
                     obj = bpy.data.objects.new(name="Text " + text, object_data=curve)
+                    md = bpy.data.meshes.new_from_object(obj)
                     if axis:
-                        obj.location = (square, (-1, 8)[color], 0.0)
+                        location = (square, (-1, 8)[color], 0.0)
                     else:
-                        obj.location = ((-1, 8)[color], square, 0.0)
-                    if color:
-                        obj.scale = (-1, -1, 0)
-                    bpy.context.scene.collection.objects.link(obj)
-                    obj.data.materials.append(silver)
-                    obj.hide_select = True
-                    obj.parent = obj_board
+                        location = ((-1, 8)[color], square, 0.0)
+                    md.transform(mathutils.Matrix.LocRotScale(
+                                 location, None, (-1, -1, 0) if color else (1, 1, 1)))
+                    bm.from_mesh(md)
+                    bpy.data.meshes.remove(md)
+                    bpy.data.objects.remove(obj)
+                    bpy.data.curves.remove(curve)
+
+        md = bpy.data.meshes.new("Labels")
+        bm.to_mesh(md)
+        bm.free()
+        md.materials.append(silver)
+        obj = bpy.data.objects.new(name="Labels", object_data=md)
+        bpy.context.scene.collection.objects.link(obj)
+        obj.hide_select = True
+        obj.parent = obj_board
 
 
     def light(self, context):
@@ -199,55 +303,59 @@ class RDC_OT_build(Operator):
         obj.hide_select = True
 
     def dice(self, context, color, is_queen=False):
+        self.new_piece(context, ("Dice", "Queen")[is_queen], self.dice_mesh(color, is_queen))
+
+    def dice_mesh(self, color, is_queen):
+        # one mesh per variant, shared by every dice built in this session
+        # by name, a mesh kept across file loads and undo could be freed
+        key = (bool(is_queen), bool(color))
+        md = bpy.data.meshes.get(dice_meshes.get(key, ""))
+        if md is not None:
+            return md
+
         def unit_to_value(vec):
             index = sum(comp * (index + 1) + 1 for index, comp in enumerate(vec))
             return value_matrix[index]
 
-        view_layer = context.view_layer
-
-        bm = bmesh.new()
-        bmesh.ops.create_cube(bm, size=2.0)
-        md = bpy.data.meshes.new("Mesh")
-        bm.to_mesh(md)
-        bm.free()
-        obj = bpy.data.objects.new(("Dice", "Queen")[is_queen], md)
-        view_layer.active_layer_collection.collection.objects.link(obj)
-        obj.select_set(True)
-        view_layer.objects.active = obj
-
-
         # --- Create Faces
 
+        # a cube of 2 with 7 x 7 quads per side, the same grid the loop cuts made
         cuts = tuple((0.3) * (n + 0.5 * bool(n == 0)) for n in range(0, 3))
+        ticks = (-1,) + tuple(-cut for cut in reversed(cuts)) + cuts + (1,)
 
-        bpy.ops.object.mode_set(mode='EDIT')
-        for side in range(3):
-            bpy.ops.mesh.loopcut(number_cuts=len(cuts) * 2, object_index=0,
-                                 edge_index=int(math.pow(side, 2)))
-
-        bpy.ops.mesh.select_all(action="DESELECT")
-        bpy.ops.object.mode_set(mode='OBJECT')
-
-        md = bpy.context.active_object.data
         bm = bmesh.new()
-        bm.from_mesh(md)
-        for vert in bm.verts:
-            new_co = []
-            for comp in vert.co:
-                index = round(comp / 0.25)
-                if abs(index) != 4:
-                    comp = math.copysign(cuts[abs(index) - 1], index)
-                new_co.append(comp)
-            vert.co = new_co
-        bm.to_mesh(md)
-        bm.free()
+        verts = {}
+
+        def new_vert(co):
+            key = tuple(round(comp * 100) for comp in co)
+            vert = verts.get(key)
+            if vert is None:
+                vert = bm.verts.new(co)
+                verts[key] = vert
+            return vert
+
+        for axis in range(3):
+            axis_u, axis_v = (other for other in range(3) if other != axis)
+            for side in (-1, 1):
+                for index_u in range(len(ticks) - 1):
+                    for index_v in range(len(ticks) - 1):
+                        face_verts = []
+                        for step_u, step_v in ((0, 0), (1, 0), (1, 1), (0, 1)):
+                            co = [0.0, 0.0, 0.0]
+                            co[axis] = side
+                            co[axis_u] = ticks[index_u + step_u]
+                            co[axis_v] = ticks[index_v + step_v]
+                            face_verts.append(new_vert(co))
+                        bm.faces.new(face_verts)
+        bmesh.ops.recalc_face_normals(bm, faces=bm.faces[:])
 
         # --- Assign Material
 
-        obj.data.materials.append(self.new_material(("Piece_Black", "Piece_White")[color],
-                                                    specular=0.2))
-        obj.data.materials.append(self.new_material(("Piece_Black", "Piece_White")
-                                                    [bool(not color)], specular=0.2))
+        md = bpy.data.meshes.new(("Dice", "Queen")[is_queen] + ("_Black", "_White")[color])
+        md.materials.append(self.new_material(("Piece_Black", "Piece_White")[color],
+                                              specular=0.2))
+        md.materials.append(self.new_material(("Piece_Black", "Piece_White")
+                                              [bool(not color)], specular=0.2))
 
         pips = ((0, 0), (-1, -1), (1, 1), (-1, 1), (1, -1), (0, -1), (0, 1), (-1, 0), (1, 0))
         pips_queen = ((-1, -1), (-1, 1), (1, -1), (1, 1))
@@ -256,10 +364,8 @@ class RDC_OT_build(Operator):
         value_matrix = tuple((n - (3 * bool(n >= 3))) * 2 + bool(n < 3)
                 for n in (reversed(range(7)) if chirality else range(7)))
 
-        bpy.ops.object.mode_set(mode='EDIT')
-        bm = bmesh.from_edit_mesh(obj.data)
-        bm.faces.ensure_lookup_table()
         for face in bm.faces:
+            face.smooth = True
             center = face.calc_center_median()
             if (not all(abs(round(comp * 100)) in (0, 45, 100) for comp in center) and
                     (not is_queen or
@@ -274,40 +380,44 @@ class RDC_OT_build(Operator):
                         not any(abs(round(comp * 100)) == 80 for comp in center)) else
                         pips_queen))
 
-        obj.data.update()
+        # after the pips, the bevel moves the outer faces
+        self.bevel(bm)
+        bm.to_mesh(md)
         bm.free()
-        bpy.ops.object.mode_set(mode='OBJECT')
-
-        self.new_bevel_modifier(context)
-        bpy.ops.object.shade_smooth()
+        dice_meshes[key] = md.name
+        return md
 
     def rook(self, context, color):
-        bpy.ops.mesh.primitive_cylinder_add(vertices=8, radius=0.97, depth=2,
-                                            end_fill_type='TRIFAN', calc_uvs=False)
-        obj = context.active_object
-        obj.name = "Rook"
-        self.new_bevel_modifier(context)
-        bpy.ops.object.shade_smooth()
-        obj.data.materials.append(self.new_material(("Piece_Black", "Piece_White")[color],
-            specular=0.2))
+        bm = bmesh.new()
+        bmesh.ops.create_cone(bm, cap_ends=True, cap_tris=True,
+                        segments=8, radius1=0.97, radius2=0.97, depth=2, calc_uvs=False)
+        self.new_piece(context, "Rook", self.piece_mesh(bm, "Rook", color))
 
     def king(self, context, color):
-        view_layer = context.view_layer
         bm = bmesh.new()
-        md = bpy.data.meshes.new("Mesh")
         bmesh.ops.create_cone(bm, cap_ends=True, cap_tris=True,
                         segments=8, radius1=0.92, radius2=0.1, depth=2.75,
                         matrix=mathutils.Matrix.Translation((0.0, 0.0, 0.75 / 2)), calc_uvs=False)
+        self.new_piece(context, "King", self.piece_mesh(bm, "King", color))
+
+    def piece_mesh(self, bm, name, color):
+        self.bevel(bm)
+        for face in bm.faces:
+            face.smooth = True
+        md = bpy.data.meshes.new(name + ("_Black", "_White")[color])
         bm.to_mesh(md)
         bm.free()
-        obj = bpy.data.objects.new("King", md)
+        md.materials.append(self.new_material(("Piece_Black", "Piece_White")[color],
+                specular=0.2))
+        return md
+
+    @staticmethod
+    def new_piece(context, name, md):
+        view_layer = context.view_layer
+        obj = bpy.data.objects.new(name, md)
         view_layer.active_layer_collection.collection.objects.link(obj)
         obj.select_set(True)
         view_layer.objects.active = obj
-        self.new_bevel_modifier(context)
-        bpy.ops.object.shade_smooth()
-        obj.data.materials.append(self.new_material(("Piece_Black", "Piece_White")[color],
-                specular=0.2))
 
     def new_material(self, name, color=None, specular=None, shadow=True):
         mat = bpy.data.materials.get(name)
@@ -339,12 +449,13 @@ class RDC_OT_build(Operator):
         return mat
 
     @staticmethod
-    def new_bevel_modifier(context):
-        # bpy.ops.object.make_links_data(type='MODIFIERS')
-        obj = context.active_object
-        modifier = obj.modifiers.new(name='Bevel', type='BEVEL')
-        modifier.width = 0.3 * 0.5
-        modifier.segments = 4
+    def bevel(bm):
+        # applied once to the shared mesh instead of a Bevel modifier on every piece,
+        # with the modifier defaults of a 30 degree angle limit and clamped overlap
+        limit = math.radians(30)
+        edges = [edge for edge in bm.edges if edge.is_manifold and edge.calc_face_angle() > limit]
+        bmesh.ops.bevel(bm, geom=edges, offset=0.3 * 0.5, offset_type='OFFSET',
+                        segments=4, profile=0.5, affect='EDGES', clamp_overlap=True)
 
     def world(self, context):
         color = list(self.theme["Ground"])
@@ -0,0 +1,359 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# Computer opponent searching the headless GameState, free of bpy.
+
+import concurrent.futures
+import math
+import os
+import random
+import time
+
+from .engine import TranspositionTable
+
+
+piece_values = {"King": 0, "Rook": 0, "Dice": 100, "Queen": 150}
+win_score = 100000
+
+EXACT, LOWER, UPPER = range(3)
+
+
+class Timeout(Exception):
+    pass
+
+
+def evaluate(state, color):
+    score = 0
+    for piece in state.pieces:
+        if piece.square is None:
+            continue
+        value = piece_values[piece.typ] + (piece.value if piece.is_dice else 0)
+        score += value if piece.color == color else -value
+    return score
+
+
+class AlphaBeta():
+    def __init__(self, time_budget=1.0, max_depth=32, table_size=1 << 16):
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.table = TranspositionTable(table_size)
+        self.nodes = 0
+        self.depth = 0
+        self.seconds = 0.0
+        self.score = 0
+        self.deadline = 0.0
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+    def best_move(self, state, color=None):
+        if color is None:
+            color = state.side_to_move()
+            if color is None:
+                color = False
+        start = time.perf_counter()
+        self.deadline = start + self.time_budget
+        self.nodes = 0
+        self.depth = 0
+        self.table.new_search()
+
+        moves = self.order(state, state.legal_moves(color), None)
+        best = moves[0] if moves else None
+        for depth in range(1, self.max_depth + 1 if len(moves) > 1 else 1):
+            try:
+                score, move = self.root(state, moves, color, depth)
+            except Timeout:
+                break
+            best = move
+            self.score = score
+            self.depth = depth
+            # search the best move first in the next iteration
+            moves.remove(move)
+            moves.insert(0, move)
+            if abs(score) >= win_score - self.max_depth:
+                break
+        self.seconds = time.perf_counter() - start
+        return best
+
+    def root(self, state, moves, color, depth):
+        alpha = -win_score - 1
+        best = moves[0]
+        for move in moves:
+            if time.perf_counter() > self.deadline:
+                raise Timeout()
+            child = state.copy()
+            child.play(move)
+            score = -self.negamax(child, not color, depth - 1, -win_score - 1, -alpha, 1)
+            if score > alpha:
+                alpha = score
+                best = move
+        self.table.put(state.hash, (alpha, EXACT, best), depth)
+        return alpha, best
+
+    def negamax(self, state, color, depth, alpha, beta, ply):
+        self.nodes += 1
+        # a node generates hundreds of moves, cheap next to reading the clock
+        if time.perf_counter() > self.deadline:
+            raise Timeout()
+        if state.winner is not None:
+            return win_score - ply if state.winner == color else -win_score + ply
+        if depth == 0:
+            return evaluate(state, color)
+
+        alpha_start = alpha
+        entry = self.table.get(state.hash)
+        best = None
+        if entry is not None:
+            best = entry[2]
+            entry = self.table.get(state.hash, depth)
+        if entry is not None:
+            score, flag = entry[0], entry[1]
+            if flag == EXACT:
+                return score
+            if flag == LOWER:
+                alpha = max(alpha, score)
+            elif flag == UPPER:
+                beta = min(beta, score)
+            if alpha >= beta:
+                return score
+
+        moves = state.legal_moves(color)
+        if not moves:
+            return 0
+        score = -win_score - 1
+        for move in self.order(state, moves, best):
+            child = state.copy()
+            child.play(move)
+            value = -self.negamax(child, not color, depth - 1, -beta, -alpha, ply + 1)
+            if value > score:
+                score = value
+                best = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+
+        if score <= alpha_start:
+            flag = UPPER
+        elif score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table.put(state.hash, (score, flag, best), depth)
+        return score
+
+    @staticmethod
+    def order(state, moves, best):
+        # King captures first, then other captures by the value of the captured piece
+        def rank(move):
+            if move == best:
+                return -2
+            captured = state.move_capture(move)
+            if captured is None:
+                return 0
+            captured = state.pieces[captured]
+            if captured.typ == "King":
+                return -1
+            return -piece_values[captured.typ] / 1000
+
+        return sorted(moves, key=rank)
+
+
+def playout(state, color, rand, max_plies):
+    for _ in range(max_plies):
+        if state.winner is not None:
+            return float(state.winner == color)
+        moves = state.legal_moves(state.side_to_move())
+        if not moves:
+            return 0.5
+        state.play(rand.choice(moves))
+    score = evaluate(state, color)
+    return 0.5 if score == 0 else float(score > 0)
+
+
+def rollout(state, color, seed, playouts, max_plies):
+    # runs in the worker processes, returns the summed result for color
+    rand = random.Random(seed)
+    return sum(playout(state.copy(), color, rand, max_plies) for _ in range(playouts))
+
+
+class Node():
+    __slots__ = ("move", "parent", "color", "children", "untried", "visits", "wins", "win")
+
+    def __init__(self, move, parent, color, moves):
+        self.move = move
+        self.parent = parent
+        # the side that played move
+        self.color = color
+        self.children = []
+        # None until the node is selected again
+        self.untried = moves
+        self.visits = 0
+        self.wins = 0.0
+        # a child whose move wins the game, always chosen once found
+        self.win = None
+
+    @property
+    def value(self):
+        return self.wins / self.visits
+
+    def select(self, exploration):
+        if self.win is not None:
+            return self.win
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.wins / child.visits +
+                   exploration * math.sqrt(log_visits / child.visits))
+
+
+class MonteCarlo():
+    def __init__(self, rollouts=2000, time_budget=5.0, seed=None, workers=None,
+                 playouts=1, max_plies=2, exploration=1.4, widening=1.0, executor=None):
+        self.rollouts = rollouts
+        self.time_budget = time_budget
+        self.seed = seed
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.playouts = playouts
+        self.max_plies = max_plies
+        self.exploration = exploration
+        # a node with n visits has up to 1 + widening * sqrt(n) children
+        self.widening = widening
+        self.rand = random.Random(seed)
+        # a shared executor is left running, only one made by __enter__ is shut down
+        self.executor = executor
+        self.own_executor = False
+        self.done = 0
+        self.seconds = 0.0
+
+    def __enter__(self):
+        if self.executor is None and self.workers > 1:
+            self.executor = concurrent.futures.ProcessPoolExecutor(self.workers)
+            self.own_executor = True
+        return self
+
+    def __exit__(self, *args):
+        if self.own_executor:
+            self.executor.shutdown()
+            self.executor = None
+            self.own_executor = False
+
+    @property
+    def rollouts_per_second(self):
+        return self.done / self.seconds if self.seconds > 0 else 0.0
+
+    def best_move(self, state, color=None):
+        if color is None:
+            color = state.side_to_move()
+            if color is None:
+                color = False
+        start = time.perf_counter()
+        deadline = start + self.time_budget
+        self.rand.seed(self.seed)
+        root = Node(None, None, not color, self.order(state, state.legal_moves(color)))
+        self.done = 0
+        jobs = 0
+        while (len(root.untried) + len(root.children) > 1 and root.win is None and
+                self.done < self.rollouts and time.perf_counter() < deadline):
+            batch = []
+            for _ in range(max(self.workers, 1)):
+                node, leaf = self.select(root, state)
+                batch.append((node, leaf))
+                # virtual loss spreads the batch over the tree
+                while node is not None:
+                    node.visits += self.playouts
+                    node = node.parent
+            if self.executor is None:
+                results = [self.evaluate(node, leaf, jobs + index)
+                           for index, (node, leaf) in enumerate(batch)]
+            else:
+                results = [self.executor.submit(rollout, leaf, node.color,
+                                                self.job_seed(jobs + index),
+                                                self.playouts, self.max_plies)
+                           if leaf.winner is None else self.evaluate(node, leaf, 0)
+                           for index, (node, leaf) in enumerate(batch)]
+            jobs += len(batch)
+            futures = [result for result in results if not isinstance(result, float)]
+            if futures:
+                concurrent.futures.wait(futures, timeout=max(deadline - time.perf_counter(), 0))
+            late = False
+            for (node, leaf), result in zip(batch, results):
+                if not isinstance(result, float):
+                    if not result.done():
+                        # past the deadline, drop the rollout and its virtual loss
+                        result.cancel()
+                        late = True
+                        while node is not None:
+                            node.visits -= self.playouts
+                            node = node.parent
+                        continue
+                    result = result.result()
+                self.done += self.playouts
+                color = node.color
+                while node is not None:
+                    node.wins += result if node.color == color else self.playouts - result
+                    node = node.parent
+            if late:
+                break
+
+        self.seconds = time.perf_counter() - start
+        if root.win is not None:
+            return root.win.move
+        children = [child for child in root.children if child.visits != 0]
+        if children:
+            # the most visited, single truncated playouts are too noisy to decide by value
+            return max(children, key=lambda child: (child.visits, child.value)).move
+        if root.children:
+            return root.children[0].move
+        return root.untried[-1] if root.untried else None
+
+    def width(self, node):
+        return 1 + int(self.widening * math.sqrt(node.visits))
+
+    def select(self, root, state):
+        node = root
+        leaf = state.copy()
+        while True:
+            if node.untried is None:
+                # most leaves are never reached again, their moves are generated on the way back
+                node.untried = self.order(leaf, leaf.legal_moves(leaf.side_to_move()))
+            # progressive widening, the captures ordered first are tried before the other moves
+            if node.win is None and (not node.children or
+                                     node.untried and len(node.children) < self.width(node)):
+                break
+            node = node.select(self.exploration)
+            leaf.play(node.move)
+        if node.untried and leaf.winner is None:
+            move = node.untried.pop()
+            leaf.play(move)
+            child = Node(move, node, not node.color, None)
+            node.children.append(child)
+            if leaf.winner == child.color:
+                node.win = child
+            node = child
+        return node, leaf
+
+    def order(self, state, moves):
+        # expanded from the end, King captures first, then the other captures,
+        # then the other moves at random
+        self.rand.shuffle(moves)
+        quiet = []
+        captures = []
+        kings = []
+        for move in moves:
+            captured = state.move_capture(move)
+            if captured is None:
+                quiet.append(move)
+            elif state.pieces[captured].typ == "King":
+                kings.append(move)
+            else:
+                captures.append(move)
+        return quiet + captures + kings
+
+    def evaluate(self, node, leaf, job):
+        if leaf.winner is not None:
+            return float(leaf.winner == node.color) * self.playouts
+        return float(rollout(leaf, node.color, self.job_seed(job),
+                             self.playouts, self.max_plies))
+
+    def job_seed(self, job):
+        # seeds a playout only, the tree still depends on the worker count and the timing
+        return None if self.seed is None else "{0}:{1}".format(self.seed, job)
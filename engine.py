@@ -0,0 +1,651 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# Headless rules of the game, free of bpy so it runs outside of Blender.
+# main.Board and main.Piece sync these plain data structures to the objects.
+
+import random
+
+
+setup = "DDDKQDDD\n   RR   \n"
+piece_names = {"K": "King", "Q": "Queen", "R": "Rook", "D": "Dice"}
+color_names = ("Black", "White")
+
+move_names = (
+    'BACKWARD_LEFT', 'BACKWARD', 'BACKWARD_RIGHT',
+    'LEFT', 'NONE', 'RIGHT',
+    'FORWARD_LEFT', 'FORWARD', 'FORWARD_RIGHT')
+move_names_straight = set(name for index, name in enumerate(move_names) if index % 2 != 0)
+move_sets = {
+    "King": set(name for name in move_names if name != 'NONE'),
+    "Queen": move_names_straight,
+    "Rook": move_names_straight,
+    "Dice": move_names_straight,
+}
+# deltas from the black side, white moves mirrored
+move_deltas = {name: (index % 3 - 1, index // 3 - 1) for index, name in enumerate(move_names)}
+delta_moves = {delta: name for name, delta in move_deltas.items()}
+
+tray_ranks = (-2, 9)
+
+chirality = True
+value_matrix = tuple((n - (3 * bool(n >= 3))) * 2 + bool(n < 3)
+        for n in (reversed(range(7)) if chirality else range(7)))
+
+# world directions of the faces: up, down, +x, -x, +y, -y
+directions = ((0, 0, 1), (0, 0, -1), (1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0))
+
+
+def axis_to_value(vec):
+    index = sum(comp * (index + 1) + 1 for index, comp in enumerate(vec))
+    return value_matrix[index]
+
+
+def is_in_bounds(square):
+    return 0 <= square[0] <= 7 and 0 <= square[1] <= 7
+
+
+def action_to_delta(color, action):
+    delta = move_deltas[action]
+    if color:
+        return (-delta[0], -delta[1])
+    return delta
+
+
+def delta_to_action(color, delta):
+    if color:
+        delta = (-delta[0], -delta[1])
+    return delta_moves.get(tuple(delta))
+
+
+def new_step_table(color, actions):
+    table = [[[] for _ in range(8)] for _ in range(8)]
+    for x in range(8):
+        for y in range(8):
+            for action in actions:
+                delta = action_to_delta(color, action)
+                loc = (x + delta[0], y + delta[1])
+                if is_in_bounds(loc):
+                    table[x][y].append((action, loc, 1 << (loc[0] * 8 + loc[1])))
+    return table
+
+
+# per color and square the in bounds steps as (action, square, square bit)
+step_tables = {typ: tuple(new_step_table(color, [name for name in move_names if name in actions])
+                          for color in range(2))
+               for typ, actions in move_sets.items()}
+
+
+def roll_faces(faces, delta):
+    up, down, east, west, north, south = faces
+    if delta[1] > 0:
+        return (south, north, east, west, up, down)
+    if delta[1] < 0:
+        return (north, south, east, west, down, up)
+    if delta[0] > 0:
+        return (west, east, up, down, north, south)
+    return (east, west, down, up, north, south)
+
+
+def flip_faces(faces):
+    up, down, east, west, north, south = faces
+    return (down, up, east, west, south, north)
+
+
+def all_orientations():
+    # the 24 ways a dice can lie as the face values pointing in each of the directions
+    orientations = [tuple(axis_to_value(direction) for direction in directions)]
+    for faces in orientations:
+        for delta in ((0, 1), (1, 0)):
+            faces_rolled = roll_faces(faces, delta)
+            if faces_rolled not in orientations:
+                orientations.append(faces_rolled)
+    return tuple(orientations)
+
+
+orientations = all_orientations()
+value_axes = {axis_to_value(direction): direction for direction in directions}
+orientation_index = {faces: index for index, faces in enumerate(orientations)}
+top_values = tuple(faces[0] for faces in orientations)
+flip_table = tuple(orientation_index[flip_faces(faces)] for faces in orientations)
+# per color and straight action the orientation after rolling one square
+roll_tables = tuple({action: tuple(orientation_index[roll_faces(faces,
+                                                                action_to_delta(color, action))]
+                                   for faces in orientations)
+                     for action in move_names_straight}
+                    for color in range(2))
+
+
+def faces_to_orientation(faces):
+    return orientation_index.get(tuple(faces), 0)
+
+
+def orientation_matrix(orientation):
+    # rotation mapping the local axes of the dice onto the world directions they face
+    faces = orientations[orientation]
+    matrix = [[0, 0, 0] for _ in range(3)]
+    for direction, value in zip(directions[::2], faces[::2]):
+        axis = value_axes[value]
+        for row in range(3):
+            for col in range(3):
+                matrix[row][col] += direction[row] * axis[col]
+    return matrix
+
+
+def new_keys(count, rand):
+    return [rand.getrandbits(64) for _ in range(count)]
+
+
+# Zobrist keys, locations are the 64 squares followed by 16 tray slots
+hash_rand = random.Random(0x5eed)
+piece_keys = tuple({typ: new_keys(80, hash_rand) for typ in move_sets} for color in range(2))
+orientation_keys = [new_keys(len(orientations), hash_rand) for _ in range(80)]
+counter_keys = [new_keys(7, hash_rand) for _ in range(80)]
+start_keys = [new_keys(7, hash_rand) for _ in range(80)]
+shared_keys = new_keys(80, hash_rand)
+path_keys = new_keys(64, hash_rand)
+active_keys = (new_keys(80, hash_rand), new_keys(80, hash_rand))
+
+
+class TranspositionTable():
+    def __init__(self, size=1 << 16):
+        self.size = 1 << max(size - 1, 1).bit_length()
+        self.mask = self.size - 1
+        self.entries = [None] * self.size
+        self.age = 0
+
+    def get(self, key, depth=0):
+        entry = self.entries[key & self.mask]
+        if entry is None or entry[0] != key or entry[1] < depth:
+            return None
+        return entry[3]
+
+    def put(self, key, value, depth=0):
+        index = key & self.mask
+        entry = self.entries[index]
+        # an entry of the current search is only replaced by an equal or deeper one
+        if (entry is None or entry[0] == key or entry[2] != self.age or
+                depth >= entry[1]):
+            self.entries[index] = (key, depth, self.age, value)
+
+    def new_search(self):
+        self.age += 1
+
+    def clear(self):
+        self.entries = [None] * self.size
+        self.age = 0
+
+
+playable_table = TranspositionTable(1 << 12)
+
+
+class PieceState():
+    __slots__ = ("name", "typ", "color", "square", "slot", "orientation",
+                 "value", "start", "counter", "shared", "path")
+
+    def __init__(self, name, typ, color, square, slot=None, orientation=0,
+                 value=1, start=None, counter=None, shared=False, path=None):
+        self.name = name
+        self.typ = typ
+        self.color = bool(color)
+        self.square = square
+        self.slot = slot
+        self.orientation = orientation
+        self.value = value
+        self.start = value if start is None else start
+        self.counter = self.start if counter is None else counter
+        if path is None:
+            path = set() if square is None else {square}
+        self.shared = shared
+        self.path = path
+
+    def copy(self):
+        return PieceState(self.name, self.typ, self.color, self.square, self.slot, self.orientation,
+                          self.value, self.start, self.counter, self.shared, set(self.path))
+
+    @property
+    def is_dice(self):
+        return self.typ in ("Dice", "Queen")
+
+    def reset(self):
+        if self.is_dice:
+            self.value = top_values[self.orientation]
+        self.start = self.value
+        self.counter = self.value
+        self.shared = False
+        self.path = {self.square}
+
+
+class StepDelta():
+    # what a single step changed, enough to revert it
+    __slots__ = ("index", "action", "piece", "other", "other_piece", "cells",
+                 "prev_active", "winner", "hash", "captured")
+
+    def __init__(self, index, action, piece, other, other_piece, cells, prev_active, winner, hash):
+        self.index = index
+        self.action = action
+        self.piece = piece
+        self.other = other
+        self.other_piece = other_piece
+        self.cells = cells
+        self.prev_active = prev_active
+        self.winner = winner
+        self.hash = hash
+        self.captured = None
+
+
+class GameState():
+    def __init__(self, pieces=(), prev_active=None, do_flip=False):
+        self.pieces = list(pieces)
+        self.prev_active = prev_active
+        self.do_flip = do_flip
+        self.names = {piece.name: index for index, piece in enumerate(self.pieces)}
+        self.winner = None
+        # occupancy of the squares and the capture tray slots by piece index
+        self.board = [[None] * 8 for _ in range(8)]
+        self.trays = ({}, {})
+        for index, piece in enumerate(self.pieces):
+            if piece.square is None:
+                if piece.slot is not None:
+                    self.trays[piece.color][piece.slot] = index
+                if piece.typ == "King":
+                    self.winner = not piece.color
+                continue
+            other = self.board[piece.square[0]][piece.square[1]]
+            # a Queen sharing a square mid move stays a guest of its resident
+            if other is None or self.pieces[other].counter != self.pieces[other].start:
+                self.board[piece.square[0]][piece.square[1]] = index
+        # per color the next unused tray slot and the free slots below it, tuples so copies share them
+        self.tray_next = tuple(max(tray) + 1 if tray else 0 for tray in self.trays)
+        self.tray_free = tuple(tuple(slot for slot in range(self.tray_next[color])
+                                     if slot not in tray)
+                               for color, tray in enumerate(self.trays))
+        self.hash = self.compute_hash()
+
+    @classmethod
+    def new(cls, setup=setup, do_flip=False):
+        pieces = []
+        counts = {}
+        for color in range(2):
+            for index_rank, rank in enumerate(setup.splitlines()):
+                index_rank = 7 * color + (-1 + bool(not color) * 2) * index_rank
+                for index_file, file in enumerate(reversed(rank) if color else rank):
+                    if file not in piece_names.keys():
+                        continue
+                    typ = piece_names[file]
+                    counts[typ] = counts.get(typ, 0) + 1
+                    name = "{0}.{1:03}".format(typ, counts[typ])
+                    pieces.append(PieceState(name, typ, color, (index_file, index_rank)))
+        return cls(pieces, do_flip=do_flip)
+
+    def copy(self):
+        state = GameState.__new__(GameState)
+        state.pieces = [piece.copy() for piece in self.pieces]
+        state.prev_active = self.prev_active
+        state.do_flip = self.do_flip
+        state.names = self.names
+        state.winner = self.winner
+        state.hash = self.hash
+        state.board = [column[:] for column in self.board]
+        state.trays = (dict(self.trays[0]), dict(self.trays[1]))
+        state.tray_next = self.tray_next
+        state.tray_free = self.tray_free
+        return state
+
+    @staticmethod
+    def location(piece):
+        if piece.square is None:
+            return 64 + (piece.slot or 0) % 16
+        return piece.square[0] * 8 + piece.square[1]
+
+    def piece_key(self, piece):
+        location = self.location(piece)
+        key = (piece_keys[piece.color][piece.typ][location] ^
+               counter_keys[location][piece.counter] ^ start_keys[location][piece.start])
+        if piece.is_dice:
+            key ^= orientation_keys[location][piece.orientation]
+            for x, y in piece.path:
+                key ^= path_keys[x * 8 + y]
+        if piece.shared:
+            key ^= shared_keys[location]
+        return key
+
+    def active_key(self):
+        if self.prev_active is None:
+            return 0
+        piece = self.pieces[self.prev_active]
+        return active_keys[piece.color][self.location(piece)]
+
+    def compute_hash(self):
+        key = self.active_key()
+        for piece in self.pieces:
+            key ^= self.piece_key(piece)
+        return key
+
+    def find(self, name):
+        return self.names.get(name)
+
+    def piece_at(self, square, exclude=None):
+        index = self.board[square[0]][square[1]]
+        return None if index == exclude else index
+
+    def may_move(self, index):
+        if self.prev_active is None:
+            return True
+        prev = self.pieces[self.prev_active]
+        if (self.prev_active == index) == (prev.counter == prev.start):
+            return False
+        return self.prev_active == index or prev.color != self.pieces[index].color
+
+    def poll_action(self, index, action, square=None):
+        piece = self.pieces[index]
+        if not self.may_move(index):
+            return False
+        if action not in move_sets[piece.typ]:
+            return False
+        if square is None:
+            square = piece.square
+            if square is None:
+                return False
+        delta = action_to_delta(piece.color, action)
+        loc = (square[0] + delta[0], square[1] + delta[1])
+        if not is_in_bounds(loc):
+            return False
+
+        collider = self.piece_at(loc, index)
+        if piece.typ == "Rook":
+            return collider is None
+        if collider is None:
+            return piece.typ == "King" or loc not in piece.path
+        collider = self.pieces[collider]
+        if piece.typ == "Queen":
+            if piece.shared and piece.counter > 1:
+                return False
+            if piece.color == collider.color:
+                return piece.counter > 1
+            return collider.typ != "Rook"
+        if piece.color == collider.color:
+            return False
+        if piece.typ == "Dice":
+            return piece.counter == 1 and collider.typ != "Rook"
+        return collider.typ != "Rook"
+
+    def step(self, index, action):
+        piece = self.pieces[index]
+        self.hash ^= self.piece_key(piece) ^ self.active_key()
+        delta = action_to_delta(piece.color, action)
+        square = piece.square
+        if self.board[square[0]][square[1]] == index:
+            self.board[square[0]][square[1]] = None
+        square = (square[0] + delta[0], square[1] + delta[1])
+        if self.board[square[0]][square[1]] is None:
+            self.board[square[0]][square[1]] = index
+        piece.square = square
+        self.prev_active = index
+
+        captured = None
+        if not piece.is_dice:
+            captured = self.capture(index)
+        else:
+            piece.orientation = roll_tables[piece.color][action][piece.orientation]
+            piece.value = top_values[piece.orientation]
+            piece.counter -= 1
+            piece.path.add(piece.square)
+            if piece.typ == "Queen" and self.piece_at(piece.square, index) is not None:
+                piece.shared = True
+            if piece.counter == 0:
+                captured = self.capture(index)
+                if self.do_flip and piece.start == piece.value:
+                    piece.orientation = flip_table[piece.orientation]
+                piece.reset()
+        self.hash ^= self.piece_key(piece) ^ self.active_key()
+        return captured
+
+    def step_delta(self, index, action):
+        piece = self.pieces[index]
+        square = piece.square
+        delta = action_to_delta(piece.color, action)
+        target = (square[0] + delta[0], square[1] + delta[1])
+        # only the resident of the target can be captured by this step
+        other = self.piece_at(target, index)
+        step_delta = StepDelta(index, action, piece.copy(), other,
+                               None if other is None else self.pieces[other].copy(),
+                               ((square, self.board[square[0]][square[1]]),
+                                (target, self.board[target[0]][target[1]])),
+                               self.prev_active, self.winner, self.hash)
+        step_delta.captured = self.step(index, action)
+        return step_delta
+
+    def take_slot(self, color):
+        free = self.tray_free[color]
+        if len(free) != 0:
+            slot = free[0]
+            self.tray_free = self.tray_free[:color] + (free[1:],) + self.tray_free[color + 1:]
+        else:
+            slot = self.tray_next[color]
+            self.tray_next = self.tray_next[:color] + (slot + 1,) + self.tray_next[color + 1:]
+        return slot
+
+    def release_slot(self, color, slot):
+        if slot == self.tray_next[color] - 1:
+            self.tray_next = self.tray_next[:color] + (slot,) + self.tray_next[color + 1:]
+        else:
+            free = tuple(sorted(self.tray_free[color] + (slot,)))
+            self.tray_free = self.tray_free[:color] + (free,) + self.tray_free[color + 1:]
+
+    def revert(self, step_delta):
+        if step_delta.captured is not None:
+            collider = self.pieces[step_delta.captured]
+            del self.trays[collider.color][collider.slot]
+            self.release_slot(collider.color, collider.slot)
+            self.pieces[step_delta.captured] = step_delta.other_piece.copy()
+        self.pieces[step_delta.index] = step_delta.piece.copy()
+        for square, index in step_delta.cells:
+            self.board[square[0]][square[1]] = index
+        self.prev_active = step_delta.prev_active
+        self.winner = step_delta.winner
+        self.hash = step_delta.hash
+
+    def capture(self, index):
+        piece = self.pieces[index]
+        captured = self.piece_at(piece.square, index)
+        if captured is None:
+            return None
+        collider = self.pieces[captured]
+        self.hash ^= self.piece_key(collider)
+        collider.square = None
+        collider.path = set()
+        self.board[piece.square[0]][piece.square[1]] = index
+        slot = self.take_slot(collider.color)
+        self.trays[collider.color][slot] = captured
+        collider.slot = slot
+        self.hash ^= self.piece_key(collider)
+        if collider.typ == "King":
+            self.winner = piece.color
+            self.prev_active = captured
+        return captured
+
+    def side_to_move(self):
+        # None while either side may start
+        if self.prev_active is None:
+            return None
+        prev = self.pieces[self.prev_active]
+        return prev.color if prev.counter != prev.start else not prev.color
+
+    def legal_moves(self, color=None):
+        moves = []
+        if self.winner is not None:
+            return moves
+        for index, piece in enumerate(self.pieces):
+            if piece.square is None or not self.may_move(index):
+                continue
+            if color is not None and piece.color != color:
+                continue
+            if piece.is_dice:
+                self.dice_moves(index, moves)
+                continue
+            x, y = piece.square
+            for action, loc, bit in step_tables[piece.typ][piece.color][x][y]:
+                other = self.board[loc[0]][loc[1]]
+                if other is not None:
+                    other = self.pieces[other]
+                    if piece.typ == "Rook" or other.color == piece.color or other.typ == "Rook":
+                        continue
+                moves.append((index, (action,)))
+        return moves
+
+    def dice_steps(self, index, x, y, counter, shared, visited):
+        piece = self.pieces[index]
+        for action, loc, bit in step_tables[piece.typ][piece.color][x][y]:
+            other = self.board[loc[0]][loc[1]]
+            if other is None or other == index:
+                if not visited & bit:
+                    yield action, loc, bit, shared
+                continue
+            if counter > 1 and (piece.typ != "Queen" or shared):
+                continue
+            other = self.pieces[other]
+            if other.color == piece.color:
+                if counter == 1:
+                    continue
+            elif other.typ == "Rook":
+                continue
+            yield action, loc, bit, True
+
+    def dice_moves(self, index, moves):
+        # depth first over the remaining steps, a path is complete when the counter runs out
+        actions = []
+
+        def search(x, y, counter, shared, visited):
+            for action, loc, bit, is_shared in self.dice_steps(index, x, y, counter,
+                                                              shared, visited):
+                if counter == 1:
+                    moves.append((index, tuple(actions) + (action,)))
+                    continue
+                actions.append(action)
+                search(loc[0], loc[1], counter - 1, is_shared, visited | bit)
+                actions.pop()
+
+        piece = self.pieces[index]
+        search(piece.square[0], piece.square[1], piece.counter, piece.shared,
+               self.path_bits(piece))
+        return moves
+
+    def path_bits(self, piece):
+        visited = 0
+        for x, y in piece.path:
+            visited |= 1 << (x * 8 + y)
+        return visited
+
+    def playable_actions(self, index):
+        # shared by all states of the same position, keyed by the piece's location and kind
+        piece = self.pieces[index]
+        playable = playable_table.get(self.hash)
+        if playable is None:
+            playable = {}
+            playable_table.put(self.hash, playable)
+        key = (self.location(piece), piece.typ, piece.color)
+        actions = playable.get(key)
+        if actions is None:
+            actions = self.find_playable(index)
+            playable[key] = actions
+        return actions
+
+    def find_playable(self, index):
+        # steps of the next move that still have a path to complete it
+        piece = self.pieces[index]
+        if piece.square is None or self.winner is not None or not self.may_move(index):
+            return set()
+        if not piece.is_dice:
+            return set(action for action in move_sets[piece.typ]
+                       if self.poll_action(index, action))
+
+        memo = {}
+
+        def completes(x, y, counter, shared, visited):
+            key = (x, y, counter, shared, visited)
+            found = memo.get(key)
+            if found is None:
+                found = any(counter == 1 or
+                            completes(loc[0], loc[1], counter - 1, is_shared, visited | bit)
+                            for action, loc, bit, is_shared in
+                            self.dice_steps(index, x, y, counter, shared, visited))
+                memo[key] = found
+            return found
+
+        return set(action for action, loc, bit, is_shared in
+                   self.dice_steps(index, piece.square[0], piece.square[1], piece.counter,
+                                   piece.shared, self.path_bits(piece))
+                   if piece.counter == 1 or
+                   completes(loc[0], loc[1], piece.counter - 1, is_shared,
+                             self.path_bits(piece) | bit))
+
+    def move_target(self, move):
+        index, actions = move
+        square = self.pieces[index].square
+        color = self.pieces[index].color
+        for action in actions:
+            delta = action_to_delta(color, action)
+            square = (square[0] + delta[0], square[1] + delta[1])
+        return square
+
+    def move_capture(self, move):
+        target = self.move_target(move)
+        other = self.piece_at(target, move[0])
+        if other is None or self.pieces[other].color == self.pieces[move[0]].color:
+            return None
+        return other
+
+    def play(self, move):
+        index, actions = move
+        captured = None
+        for action in actions:
+            captured = self.step(index, action)
+        return captured
+
+    def sum_up(self):
+        sums = [0, 0]
+        for piece in self.pieces:
+            if piece.square is not None and piece.is_dice:
+                sums[piece.color] += piece.value
+        return tuple(sums)
+
+    def start_color(self):
+        sums = self.sum_up()
+        if sums[0] != sums[1]:
+            return bool(sums[0] > sums[1])
+
+        sides = []
+        for color in range(2):
+            values = [1 for _ in range(0, 7)]
+            for file in range(0, 7):
+                index = self.piece_at((file, (0, 7)[color]))
+                if index is None:
+                    continue
+                if color: file = 7 - file
+                file -= 4
+                if file < 0: file = 7 + file
+                values[file] = self.pieces[index].value
+            sides.append(values)
+        for values in zip(*sides):
+            if values[0] != values[1]:
+                return bool(values[0] > values[1])
+        return False
+
+    def start(self):
+        start_color = self.start_color()
+        for index, piece in enumerate(self.pieces):
+            if piece.color != start_color:
+                self.hash ^= self.active_key()
+                self.prev_active = index
+                self.hash ^= self.active_key()
+                break
+        return start_color
+
+    def randomize(self, seed=None):
+        rand = random.Random(seed)
+        for piece in self.pieces:
+            if piece.is_dice:
+                piece.orientation = rand.randrange(len(orientations))
+                piece.reset()
+        self.hash = self.compute_hash()
+        return self.start()
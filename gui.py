@@ -3,7 +3,7 @@
 import bpy
 from bpy.types import Operator, Panel
 
-from .main import Board, RDC_OT_board_history, RDC_OT_move_piece
+from .main import Board, RDC_OT_board_history
 
 
 class RDC_PT_main(Panel):
@@ -34,46 +34,47 @@ class RDC_PT_main(Panel):
             row.operator('rdc_game.new', text='New Game', icon='SCENE_DATA')
             return
 
+        info = Board.panel_info(context)
         row = layout.row(align=True)
         row.label(text="Move Piece:") # dpad
         row = layout.row(align=True)
         col = row.column()
         op = col.operator('object.rdc_game_piece', text='FL', icon='LOOP_BACK')
         op.action = 'FORWARD_LEFT'
-        col.enabled = RDC_OT_move_piece.poll_action(op, context)
+        col.enabled = info["enabled"][op.action]
         col = row.column()
         op = col.operator('object.rdc_game_piece', text='Forward', icon='SORT_DESC')
         op.action = 'FORWARD'
-        col.enabled = RDC_OT_move_piece.poll_action(op, context)
+        col.enabled = info["enabled"][op.action]
         col = row.column()
         op = col.operator('object.rdc_game_piece', text='FR', icon='LOOP_FORWARDS')
         op.action = 'FORWARD_RIGHT'
-        col.enabled = RDC_OT_move_piece.poll_action(op, context)
+        col.enabled = info["enabled"][op.action]
         row = layout.row(align=True)
         col = row.column()
         op = col.operator('object.rdc_game_piece', text='Left', icon='BACK')
         op.action = 'LEFT'
-        col.enabled = RDC_OT_move_piece.poll_action(op, context)
+        col.enabled = info["enabled"][op.action]
         col = row.column()
         op = col.operator('rdc_game.set_view', text='Switch', icon='IMAGE_ALPHA')
         op.action = 'SWITCH'
         col = row.column()
         op = col.operator('object.rdc_game_piece', text='Right', icon='FORWARD')
         op.action = 'RIGHT'
-        col.enabled = RDC_OT_move_piece.poll_action(op, context)
+        col.enabled = info["enabled"][op.action]
         row = layout.row(align=True)
         col = row.column()
         op = col.operator('object.rdc_game_piece', text='BL', icon='TRACKING_BACKWARDS')
         op.action = 'BACKWARD_LEFT'
-        col.enabled = RDC_OT_move_piece.poll_action(op, context)
+        col.enabled = info["enabled"][op.action]
         col = row.column()
         op = col.operator('object.rdc_game_piece', text='Backward', icon='SORT_ASC')
         op.action = 'BACKWARD'
-        col.enabled = RDC_OT_move_piece.poll_action(op, context)
+        col.enabled = info["enabled"][op.action]
         col = row.column()
         op = col.operator('object.rdc_game_piece', text='BR', icon='ANIM_DATA')
         op.action = 'BACKWARD_RIGHT'
-        col.enabled = RDC_OT_move_piece.poll_action(op, context)
+        col.enabled = info["enabled"][op.action]
         layout.row().separator()
 
         row = layout.row()
@@ -85,25 +86,21 @@ class RDC_PT_main(Panel):
         op = col.operator('rdc_game.board_history', text='Redo', icon='TRIA_RIGHT')
         op.action = 'REDO'
         col.enabled = RDC_OT_board_history.poll_action(op, context)
+        row = layout.row()
+        row.operator('object.rdc_game_computer', text='Computer Move', icon='MEMORY')
 
         row = layout.row()
         row.label(text="Value: [{0}] at {1} {2}"
-                       .format(context.active_object.get("value", 0)
-                               if context.active_object else 1,
-                               Board.loc_to_algebraic(context),
-                               ("■", "□")[Board.get_color(context)]))
+                       .format(info["value"], info["algebraic"], ("■", "□")[info["color"]]))
         row = layout.row()
-        moves = (context.active_object.get("counter", 0)
-                               if context.active_object else 1,
-                               context.active_object.get("start", 0)
-                               if context.active_object else 1)
+        moves = (info["counter"], info["start"])
         row.label(text="Moves: {0}{1}{2}  {3} / {4}"
                        .format("█ " * moves[0],
                                "▒ " * (moves[1] - moves[0]),
                                "░ " * (6 - moves[1]),
                                moves[0], moves[1]))
         row = layout.row()
-        row.label(text="Sum: {0} / {1}".format(*Board.sum_up(context)))
+        row.label(text="Sum: {0} / {1}".format(*info["sums"]))
 
         layout.row().separator()
         row = layout.row(align=True)
@@ -1,9 +1,13 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+import concurrent.futures
 import math
+import multiprocessing
+import os
 import random
 
 import bpy
+from bpy.app.handlers import persistent
 from bpy.props import (
             BoolProperty,
             EnumProperty,
@@ -16,6 +20,10 @@ from bpy.types import (
             )
 import mathutils
 
+from . import engine
+from .computer import AlphaBeta, MonteCarlo
+from .engine import GameState
+
 
 class RDC_OT_board_history(Operator):
     bl_idname = 'rdc_game.board_history'
@@ -30,17 +38,26 @@ class RDC_OT_board_history(Operator):
     )
 
     def poll_action(self, context):
+        undo, redo = Board.history(context)
         if self.action == 'UNDO':
-            return bpy.ops.ed.undo.poll()
+            return len(undo) != 0
         elif self.action == 'REDO':
-            return bpy.ops.ed.redo.poll()
+            return len(redo) != 0
         return True
 
     def execute(self, context):
+        if not self.poll_action(context):
+            return {'CANCELLED'}
+        undo, redo = Board.history(context)
         if self.action == 'UNDO':
-            bpy.ops.ed.undo()
+            record = undo.pop()
+            record.undo(context, Board.state(context))
+            redo.append(record)
         elif self.action == 'REDO':
-            bpy.ops.ed.redo()
+            record = redo.pop()
+            record.redo(context, Board.state(context))
+            undo.append(record)
+        bump_version(context.scene)
         return {'FINISHED'}
 
 
@@ -69,22 +86,58 @@ class RDC_OT_board(Operator):
             Board.go(context)
         elif self.action == 'INIT':
             Board.init(context)
+        bump_version(context.scene)
         return {'FINISHED'}
 
 
+game_states = {}
+# per scene the undo and redo stacks of StepRecords
+histories = {}
+# bumped by every change of the game, keys the panel cache
+state_versions = {}
+panel_cache = {}
+instr_cache = {}
+# the process pool of the Monte Carlo rollouts, started once per session
+rollout_pools = {}
+
+
+def rollout_pool():
+    workers = os.cpu_count() or 1
+    if workers <= 1:
+        return None
+    pool = rollout_pools.get(workers)
+    if pool is None:
+        # spawned, forking would copy all of Blender with its threads and GPU state
+        pool = concurrent.futures.ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("spawn"))
+        rollout_pools[workers] = pool
+    return pool
+
+
+def bump_version(scene):
+    state_versions[scene.name] = state_versions.get(scene.name, 0) + 1
+
+
 class Board():
-    setup = "DDDKQDDD\n   RR   \n"
-    piece_names = {"K": "King", "Q": "Queen", "R": "Rook", "D": "Dice"}
+    setup = engine.setup
+    piece_names = engine.piece_names
 
     @staticmethod
     def init(context):
-        for obj in get_fuzzy(context, "Pieces").all_objects:
+        coll_pieces = get_fuzzy(context, "Pieces")
+        for color in range(2):
+            for obj in get_fuzzy(context, ("Black", "White")[color], coll_pieces).objects:
+                if "color" not in obj:
+                    Board.stamp(obj, color, Board.get_type(obj))
+        for obj in coll_pieces.all_objects:
             piece = Piece.new(context, obj)
             piece.init(obj)
         context.scene.rdc_game_current_frame = 0
         context.scene.rdc_game_prev_active = ""
         context.scene.instr_import = ""
         context.scene.instr_export = ""
+        game_states.pop(context.scene.name, None)
+        histories.pop(context.scene.name, None)
 
     @staticmethod
     def reset(context):
@@ -94,11 +147,11 @@ class Board():
         if coll_pieces is None:
             coll_pieces = bpy.data.collections.new("Pieces")
             context.scene.collection.children.link(coll_pieces)
-        else:
-            for obj in coll_pieces.all_objects:
-                obj.select_set(True)
-            bpy.ops.object.delete(use_global=True, confirm=False)
 
+        keys = KeyWriter()
+        removed = []
+        actions = []
+        obj = None
         for color in range(2):
             coll_type_color = get_fuzzy(context, ("Black", "White")[color],
                                         get_fuzzy(context, "Types"))
@@ -107,22 +160,119 @@ class Board():
                 coll_pieces_color = bpy.data.collections.new(("Black", "White")[color])
                 coll_pieces.children.link(coll_pieces_color)
 
-            obj_names = {}
+            # reuse the pieces of the last game in place, per type in name order
+            pool = {}
+            for other in sorted(coll_pieces_color.objects, key=lambda other: other.name):
+                pool.setdefault(Board.get_type(other), []).append(other)
+
+            templates = {}
             for index_rank, rank in enumerate(Board.setup.splitlines()):
                 index_rank = 7 * color + (-1 + bool(not color) * 2) * index_rank
                 for index_file, file in enumerate(reversed(rank) if color else rank):
                     if file not in Board.piece_names.keys():
                         continue
                     name = Board.piece_names[file]
-                    if name not in obj_names.keys():
-                        obj_names[name] = get_fuzzy(context, name, coll_type_color).name
+                    if name not in templates.keys():
+                        templates[name] = get_fuzzy(context, name, coll_type_color)
+                    template = templates[name]
+
+                    if pool.get(name):
+                        obj = pool[name].pop(0)
+                        if obj.animation_data is not None:
+                            if obj.animation_data.action is not None:
+                                actions.append(obj.animation_data.action)
+                            obj.animation_data_clear()
+                        obj.data = template.data
+                        obj.rotation_euler = template.rotation_euler
+                        obj.scale = template.scale
+                    else:
+                        # shares the mesh like a linked duplicate
+                        obj = template.copy()
+                        obj.hide_viewport = False
+                        coll_pieces_color.objects.link(obj)
+                    obj.location = (index_file, index_rank, template.location.z)
+                    Board.stamp(obj, color, name)
+                    keys.add(obj, 'location')
+                    keys.add(obj, 'rotation_euler')
+            for others in pool.values():
+                removed.extend(others)
+
+        if len(removed) != 0:
+            bpy.data.batch_remove(removed)
+        actions = [action for action in actions if action.users == 0]
+        if len(actions) != 0:
+            bpy.data.batch_remove(actions)
+        keys.write()
+        if obj is not None:
+            for other in context.selected_objects:
+                other.select_set(False)
+            context.view_layer.objects.active = obj
+            obj.select_set(True)
+        game_states.pop(context.scene.name, None)
+
+    @staticmethod
+    def state(context):
+        state = game_states.get(context.scene.name)
+        if state is None:
+            state = Board.read_state(context)
+            game_states[context.scene.name] = state
+        state.do_flip = context.scene.do_flip
+        return state
+
+    @staticmethod
+    def history(context):
+        history = histories.get(context.scene.name)
+        if history is None:
+            history = ([], [])
+            histories[context.scene.name] = history
+        return history
 
-                    bpy.ops.object.add_named(linked=True, name=obj_names[name])
-                    obj = context.active_object
-                    coll_pieces_color.objects.link(obj)
-                    obj.location = (index_file, index_rank, obj.location.z)
-                    obj.keyframe_insert(data_path='location')
-                    obj.keyframe_insert(data_path='rotation_euler')
+    @staticmethod
+    def panel_info(context):
+        # what the main panel shows, evaluated once per game change and active object
+        obj = context.active_object
+        key = (state_versions.get(context.scene.name, 0), obj.name if obj is not None else None)
+        cached = panel_cache.get(context.scene.name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        piece = Piece.new(context) if obj is not None else None
+        info = {
+            "enabled": {action: piece is not None and piece.poll_action(context, action)
+                        for action in engine.move_names},
+            "value": obj.get("value", 0) if obj is not None else 1,
+            "counter": obj.get("counter", 0) if obj is not None else 1,
+            "start": obj.get("start", 0) if obj is not None else 1,
+            "algebraic": Board.loc_to_algebraic(context),
+            "color": Board.get_color(context) if obj is not None else False,
+            "sums": Board.sum_up(context),
+        }
+        panel_cache[context.scene.name] = (key, info)
+        return info
+
+    @staticmethod
+    def read_state(context):
+        pieces = []
+        coll_pieces = get_fuzzy(context, "Pieces")
+        for color in range(2 if coll_pieces is not None else 0):
+            coll_pieces_color = get_fuzzy(context, ("Black", "White")[color], coll_pieces)
+            if coll_pieces_color is None:
+                continue
+            for obj in coll_pieces_color.objects:
+                piece = Piece.new(context, obj)
+                if piece is not None:
+                    pieces.append(piece.to_state(obj, color))
+
+        state = GameState(pieces, do_flip=context.scene.do_flip)
+        if context.scene.rdc_game_prev_active:
+            state.prev_active = state.find(context.scene.rdc_game_prev_active)
+        return state
+
+    @staticmethod
+    def get_object(context, state, index):
+        if index is None:
+            return None
+        return context.scene.collection.all_objects.get(state.pieces[index].name)
 
     @staticmethod
     def intersect_board(context, obj=None, loc=None):
@@ -133,12 +283,12 @@ class Board():
                 loc = context.active_object.location
             else:
                 return
-        loc = tuple(map(round, loc))
-        for other in get_fuzzy(context, "Pieces").all_objects:
-            loc_other = tuple(map(round, other.location))
-            if (loc_other == loc and (obj is None or other.name != obj.name)):
-                return other
-        return None
+        loc = tuple(map(round, loc[:2]))
+        if not Board.is_in_bounds(loc):
+            return None
+        state = Board.state(context)
+        index = state.piece_at(loc, None if obj is None else state.find(obj.name))
+        return Board.get_object(context, state, index)
 
     @staticmethod
     def is_in_bounds(loc):
@@ -146,26 +296,17 @@ class Board():
         return (loc[0] >= 0 and loc[0] <= 7 and loc[1] >= 0 and loc[1] <= 7)
 
     @staticmethod
-    def intersect_out(context, obj):
-        x = 0
-        while True:
-            for other in get_fuzzy(context, "Pieces").all_objects:
-                if round(other.location.y) not in (9, -2):
-                    continue
-                if (round(other.location.x) == x and
-                        round(other.location.y) == round(obj.location.y) and
-                        other.name != obj.name):
-                    x += 1
-                    break
-            else:
-                break
-        obj.location.x = x
-        obj.keyframe_insert(data_path='location')
+    def stamp(obj, color, typ):
+        obj["color"] = int(color)
+        obj["type"] = typ
 
     @staticmethod
     def get_color(context, obj=None):
         if obj is None:
             obj = context.active_object
+        color = obj.get("color")
+        if color is not None:
+            return bool(color)
         for color in range(2):
             for other in get_fuzzy(context, ("Black", "White")[color],
                                    get_fuzzy(context, "Pieces")).objects:
@@ -175,21 +316,17 @@ class Board():
 
     @staticmethod
     def get_type(obj):
+        typ = obj.get("type")
+        if typ is not None:
+            return typ
         for value in Board.piece_names.values():
             if obj.name.startswith(value):
                 return value
 
     @staticmethod
     def sum_up(context, flip=True):
-        sums = [0, 0]
-        for color in range(2):
-            for other in get_fuzzy(context, ("Black", "White")[color],
-                                   get_fuzzy(context, "Pieces")).objects:
-                if not Board.is_in_bounds(other.location):
-                    continue
-                if Board.get_type(other) in ("Dice", "Queen"):
-                    sums[color] += other["value"]
-        return (tuple(sums) if not flip or context.active_object is None or
+        sums = Board.state(context).sum_up()
+        return (sums if not flip or context.active_object is None or
                 not Board.get_color(context) else (sums[1], sums[0]))
 
     @staticmethod
@@ -211,34 +348,10 @@ class Board():
 
     @staticmethod
     def start(context, op):
-        sums = Board.sum_up(context, flip=False)
-        if sums[0] != sums[1]:
-            start_color = bool(sums[0] > sums[1])
-        else:
-            sides = []
-            for color in range(2):
-                values = [1 for _ in range(0, 7)]
-                for file in range(0, 7):
-                    obj = Board.intersect_board(context, loc=(file, (0, 7)[color]))
-                    if not obj:
-                        continue
-                    if color: file = 7 - file
-                    file -= 4
-                    if file < 0: file = 7 + file
-                    values[file] = obj["value"]
-
-                sides.append(values)
-            for values in zip(*sides):
-                if values[0] != values[1]:
-                    start_color = bool(values[0] > values[1])
-                    break
-            else:
-                start_color = False
-
+        state = Board.state(context)
+        start_color = state.start()
         op.report({'INFO'}, ("Black", "White")[start_color] + " moves first!")
-        context.scene.rdc_game_prev_active = get_fuzzy(
-            context, ("Black", "White")[not start_color],
-            get_fuzzy(context, "Pieces")).objects[0].name
+        context.scene.rdc_game_prev_active = state.pieces[state.prev_active].name
         return start_color
 
     @staticmethod
@@ -246,32 +359,42 @@ class Board():
         if collider is not None and Board.get_type(collider) == "King":
             end_color = Board.get_color(context, obj)
             op.report({'INFO'}, ("Black", "White")[end_color] + " wins!!!")
-            context.scene.rdc_game_prev_active = collider.name
             return end_color
 
     @staticmethod
     def randomize(context, op):
         random.seed(context.scene.seed if len(context.scene.seed) != 0 else None, version=2)
+        keys = KeyWriter()
         for obj in get_fuzzy(context, "Pieces").all_objects:
             piece = Piece.new(context, obj)
             if hasattr(piece, "randomize"):
-                piece.randomize(obj)
+                piece.randomize(obj, keys)
+        keys.write()
+        game_states.pop(context.scene.name, None)
+        histories.pop(context.scene.name, None)
         Board.start(context, op)
 
     @staticmethod
     def poll_instr(self, context):
-        instr = context.scene.instr_import
-        instr = instr.strip().replace(' ', '')
+        # validated once per instruction and game version, the import panel polls on every redraw
+        instr = context.scene.instr_import.strip().replace(' ', '').upper()
+        key = (instr, state_versions.get(context.scene.name, 0))
+        cached = instr_cache.get(context.scene.name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        result = Board.check_instr(context, instr)
+        instr_cache[context.scene.name] = (key, result)
+        return result
+
+    @staticmethod
+    def check_instr(context, instr):
         if len(instr) == 0 or len(instr) % 2 != 0:
             return False
         instr = [instr[i:i + 2] for i in range(0, len(instr), 2)]
-        for index, algebraic in enumerate(instr):
-            for index_rec, rec in enumerate(instr):
-                if index != index_rec and rec == algebraic:
-                    return False
+        if len(set(instr)) != len(instr):
+            return False
 
-        obj = None
-        prev = None
+        locs = []
         for algebraic in instr:
             try:
                 loc = Board.algebraic_to_loc(algebraic)
@@ -279,22 +402,21 @@ class Board():
                 return False
             if not Board.is_in_bounds(loc):
                 return False
-            if prev is None:
-                obj = Board.intersect_board(context, loc=loc)
-                if not obj:
-                    return False
-                if len(instr) - 1 != obj["value"]:
-                    return False
-                prev = loc
-                continue
+            locs.append(loc[:2])
 
-            piece = Piece.new(context, obj)
-            delta = tuple(a - b for a, b in zip(prev, loc))
-            action = piece.delta_to_action(context, obj, delta)
-            valid = piece.poll_action(context, obj=obj, obj_loc=prev, action=action)
-            if not valid:
+        # play the steps on a copy so counter, path and captures follow the move
+        state = Board.state(context).copy()
+        index = state.piece_at(locs[0])
+        if index is None:
+            return False
+        piece = state.pieces[index]
+        if len(locs) - 1 != piece.value:
+            return False
+        for prev, loc in zip(locs, locs[1:]):
+            action = engine.delta_to_action(piece.color, (loc[0] - prev[0], loc[1] - prev[1]))
+            if action is None or not state.poll_action(index, action):
                 return False
-            prev = loc
+            state.step(index, action)
         return True
 
     @staticmethod
@@ -313,9 +435,10 @@ class Board():
                 context.view_layer.objects.active = obj
                 obj.select_set(True)
             else:
-                piece = Piece.new(context, obj)
-                delta = tuple(a - b for a, b in zip(prev, loc))
-                bpy.ops.object.rdc_game_piece(action=piece.delta_to_action(context, obj, delta))
+                state = Board.state(context)
+                piece = state.pieces[state.find(obj.name)]
+                delta = (loc[0] - prev[0], loc[1] - prev[1])
+                bpy.ops.object.rdc_game_piece(action=engine.delta_to_action(piece.color, delta))
             prev = loc
 
 
@@ -355,15 +478,213 @@ class RDC_OT_move_piece(Operator):
         if not piece.poll_action(context, action=self.action):
             return {'CANCELLED'}
         piece.move(self, context, self.action)
+        bump_version(context.scene)
         return {'FINISHED'}
 
 
+class RDC_OT_computer_move(Operator):
+    bl_idname = 'object.rdc_game_computer'
+    bl_label = 'Computer Move'
+    bl_description = 'Let the computer play the next move'
+    bl_options = {'UNDO',}
+
+    def execute(self, context):
+        bpy.context.scene.frame_set(context.scene.rdc_game_current_frame)
+        state = Board.state(context)
+        color = state.side_to_move()
+        if color is None and context.active_object is not None:
+            color = Board.get_color(context)
+        scene = context.scene
+        if scene.rdc_game_engine == 'MONTE_CARLO':
+            search = MonteCarlo(rollouts=scene.rdc_game_rollouts, time_budget=scene.rdc_game_time_budget,
+                                seed=scene.seed if len(scene.seed) != 0 else None,
+                                executor=rollout_pool())
+            move = search.best_move(state.copy(), color)
+            info = "{0} rollouts, {1:.0f} rollouts/s".format(search.done, search.rollouts_per_second)
+        else:
+            search = AlphaBeta(time_budget=scene.rdc_game_time_budget)
+            move = search.best_move(state.copy(), color)
+            info = "Depth {0}, {1} nodes, {2:.0f} nodes/s".format(
+                search.depth, search.nodes, search.nodes_per_second)
+        if move is None:
+            self.report({'WARNING'}, "No move left")
+            return {'CANCELLED'}
+
+        index, actions = move
+        obj = Board.get_object(context, state, index)
+        for other in context.selected_objects:
+            other.select_set(False)
+        context.view_layer.objects.active = obj
+        obj.select_set(True)
+        for action in actions:
+            bpy.ops.object.rdc_game_piece(action=action)
+        self.report({'INFO'}, info)
+        return {'FINISHED'}
+
+
+class KeyWriter():
+    # collects the keys of a move and writes each F-curve in one pass
+    group = "Object Transforms"
+
+    def __init__(self):
+        self.keys = {}
+
+    def add(self, obj, data_path, frame=None):
+        # keys the current value like keyframe_insert
+        if frame is None:
+            frame = bpy.context.scene.frame_current
+        self.keys.setdefault((obj, data_path), {})[frame] = tuple(getattr(obj, data_path))
+
+    def write(self):
+        for (obj, data_path), frames in self.keys.items():
+            if obj.animation_data is None:
+                obj.animation_data_create()
+            action = obj.animation_data.action
+            if action is None:
+                action = bpy.data.actions.new(obj.name + "Action")
+                obj.animation_data.action = action
+            keys = sorted(frames.items())
+            for index in range(len(keys[0][1])):
+                curve = action.fcurves.find(data_path, index=index)
+                if curve is None:
+                    curve = action.fcurves.new(data_path, index=index, action_group=self.group)
+                self.write_curve(curve, [(frame, values[index]) for frame, values in keys])
+        self.keys.clear()
+
+    @staticmethod
+    def write_curve(curve, keys):
+        points = curve.keyframe_points
+        count = len(points)
+        co = [0.0] * (count * 2)
+        points.foreach_get("co", co)
+        # keys usually follow the last one, only look up existing frames otherwise
+        existing = {}
+        if count != 0 and keys[0][0] <= co[-2]:
+            existing = {co[index * 2]: index for index in range(count)}
+        added = 0
+        for frame, value in keys:
+            index = existing.get(frame)
+            if index is None:
+                co.extend((frame, value))
+                added += 1
+            else:
+                co[index * 2 + 1] = value
+        points.add(added)
+        points.foreach_set("co", co)
+        curve.update()
+
+
+class StepRecord():
+    # a step of the game history, reverted and replayed on the objects and the state
+    # without going through the global undo
+    props = ("value", "start", "counter", "shared", "start_loc", "path")
+    paths = ("location", "rotation_euler")
+
+    def __init__(self, context, state, index, action):
+        self.step_delta = None
+        self.scene = [self.scene_snapshot(context.scene), None]
+        names = [state.pieces[index].name]
+        other = state.piece_at(self.target(state, index, action), index)
+        if other is not None:
+            names.append(state.pieces[other].name)
+        # per object name the snapshots before and after and the keys the step inserted
+        self.objects = {}
+        for name in names:
+            obj = context.scene.collection.all_objects.get(name)
+            self.objects[name] = [self.snapshot(obj), None, self.last_keys(obj)]
+
+    @staticmethod
+    def target(state, index, action):
+        piece = state.pieces[index]
+        delta = engine.action_to_delta(piece.color, action)
+        return (piece.square[0] + delta[0], piece.square[1] + delta[1])
+
+    @staticmethod
+    def scene_snapshot(scene):
+        return (scene.rdc_game_current_frame, scene.rdc_game_prev_active, scene.instr_export)
+
+    def snapshot(self, obj):
+        props = {}
+        for key in self.props:
+            if key in obj:
+                value = obj[key]
+                props[key] = value.to_list() if hasattr(value, "to_list") else value
+        return tuple(obj.location), tuple(obj.rotation_euler), props
+
+    def last_keys(self, obj):
+        frames = {}
+        if obj.animation_data and obj.animation_data.action:
+            for curve in obj.animation_data.action.fcurves:
+                if curve.data_path in self.paths and len(curve.keyframe_points) != 0:
+                    frames[curve.data_path] = max(frames.get(curve.data_path, -math.inf),
+                                                  curve.keyframe_points[-1].co[0])
+        return frames
+
+    def added_keys(self, obj, last_keys):
+        added = set()
+        for curve in obj.animation_data.action.fcurves:
+            if curve.data_path not in self.paths:
+                continue
+            last = last_keys.get(curve.data_path, -math.inf)
+            for point in reversed(curve.keyframe_points):
+                if point.co[0] <= last:
+                    break
+                added.add((curve.data_path, int(point.co[0])))
+        return sorted(added, key=lambda key: key[1])
+
+    def end(self, context, step_delta):
+        self.step_delta = step_delta
+        self.scene[1] = self.scene_snapshot(context.scene)
+        for name, entry in self.objects.items():
+            obj = context.scene.collection.all_objects.get(name)
+            entry[1] = self.snapshot(obj)
+            entry[2] = self.added_keys(obj, entry[2])
+
+    def apply(self, obj, snapshot):
+        obj.location, obj.rotation_euler, props = snapshot
+        for key, value in props.items():
+            obj[key] = value
+
+    def apply_scene(self, context, snapshot):
+        scene = context.scene
+        scene.rdc_game_current_frame, scene.rdc_game_prev_active, scene.instr_export = snapshot
+        scene.frame_set(scene.rdc_game_current_frame)
+
+    def select(self, context):
+        obj = context.scene.collection.all_objects.get(self.step_delta.piece.name)
+        for other in context.selected_objects:
+            other.select_set(False)
+        context.view_layer.objects.active = obj
+        obj.select_set(True)
+
+    def undo(self, context, state):
+        for name, (before, after, added) in self.objects.items():
+            obj = context.scene.collection.all_objects.get(name)
+            for path, frame in added:
+                obj.keyframe_delete(data_path=path, frame=frame)
+            self.apply(obj, before)
+        state.revert(self.step_delta)
+        self.apply_scene(context, self.scene[0])
+        self.select(context)
+
+    def redo(self, context, state):
+        frame = self.scene[1][0]
+        keys = KeyWriter()
+        for name, (before, after, added) in self.objects.items():
+            obj = context.scene.collection.all_objects.get(name)
+            for path, key_frame in added:
+                self.apply(obj, before if key_frame < frame else after)
+                keys.add(obj, path, key_frame)
+            self.apply(obj, after)
+        keys.write()
+        state.step(self.step_delta.index, self.step_delta.action)
+        self.apply_scene(context, self.scene[1])
+        self.select(context)
+
+
 class Piece():
-    move_names = (
-        'BACKWARD_LEFT', 'BACKWARD', 'BACKWARD_RIGHT',
-        'LEFT', 'NONE', 'RIGHT',
-        'FORWARD_LEFT', 'FORWARD', 'FORWARD_RIGHT')
-    move_names_straight = set(name for index, name in enumerate(move_names) if index % 2 != 0)
+    move_names = engine.move_names
+    move_names_straight = engine.move_names_straight
 
     def __init__(self, obj):
         self.obj = obj
@@ -392,37 +713,46 @@ class Piece():
         obj["start"] = obj["value"]
         obj["counter"] = obj["value"]
 
-    def poll_action(self, context, obj=None, obj_loc=None, action=None):
-        if action is None:
-            action = self.action
-        if obj is None:
-            obj = context.active_object
-
-        if context.scene.rdc_game_prev_active:
-            prev = context.scene.collection.all_objects.get(context.scene.rdc_game_prev_active)
-            if (prev.name == obj.name) == (prev["counter"] == prev["start"]):
-                return None
-            if (prev.name != obj.name and
-                    Board.get_color(context, prev) == Board.get_color(context, obj)):
-                return None
-        if not self.is_in_move_set(action):
-            return None
-        delta = self.action_to_delta(context, obj, action)
-        if obj_loc is None:
-            obj_loc = obj.location
-        loc = tuple(a + b for a, b in zip(obj_loc, delta))
-        if not Board.is_in_bounds(loc):
-            return None
-        return loc
+    def to_state(self, obj, color):
+        loc = tuple(map(round, obj.location[:2]))
+        is_in_bounds = Board.is_in_bounds(loc)
+        return engine.PieceState(obj.name, Board.get_type(obj), color,
+                                 loc if is_in_bounds else None,
+                                 slot=None if is_in_bounds else loc[0],
+                                 value=obj.get("value", 1), start=obj.get("start", 1),
+                                 counter=obj.get("counter", 1))
+
+    def sync(self, obj, piece):
+        obj["value"] = piece.value
+        obj["start"] = piece.start
+        obj["counter"] = piece.counter
+
+    def poll_action(self, context, action):
+        state = Board.state(context)
+        index = state.find(self.obj.name)
+        if index is None:
+            return False
+        return action in state.playable_actions(index)
 
     def move(self, op, context, action):
+        state = Board.state(context)
+        index = state.find(self.obj.name)
+        record = StepRecord(context, state, index, action)
+        step_delta = state.step_delta(index, action)
+        self.keys = KeyWriter()
         self.move_start(op, context, action)
-        self.move_end(op, context)
+        self.move_end(op, context, state, index, step_delta.captured)
+        self.keys.write()
+        context.scene.rdc_game_prev_active = state.pieces[state.prev_active].name
+        record.end(context, step_delta)
+        undo, redo = Board.history(context)
+        undo.append(record)
+        redo.clear()
 
     def move_start(self, op, context, action):
         obj = context.active_object
-        obj.keyframe_insert(data_path='location')
-        obj.keyframe_insert(data_path='rotation_euler')
+        self.keys.add(obj, 'location')
+        self.keys.add(obj, 'rotation_euler')
         for obj_sel in context.selected_objects:
             obj_sel.select_set(obj_sel is obj)
         # make local for sync
@@ -442,94 +772,56 @@ class Piece():
             instr_export = ""
         bpy.context.scene.instr_export = instr_export
 
-    def move_end(self, op, context):
+    def move_end(self, op, context, state, index, captured):
         obj = context.active_object
-        context.scene.rdc_game_prev_active = obj.name
-        self.capture(context, obj, op)
-        obj.keyframe_insert(data_path='location')
-        obj.keyframe_insert(data_path='rotation_euler')
-
-    def is_on_path(self, obj, loc=None): # todo to algebraic encode
-        if loc is None:
-            loc = obj.location
-        if not obj.animation_data.action:
-            return False
-        loc = tuple(map(round, loc))
-        start_loc = tuple(map(round, obj["start_loc"]))
+        self.capture(context, obj, op, state, captured)
+        self.sync(obj, state.pieces[index])
+        self.keys.add(obj, 'location')
+        self.keys.add(obj, 'rotation_euler')
+
+    def get_path(self, obj):
+        loc = tuple(map(round, obj.location[:2]))
+        path = {loc}
+        if not obj.animation_data or not obj.animation_data.action:
+            return path
+        start_loc = tuple(map(round, obj["start_loc"][:2]))
         curves = {}
         for curve in obj.animation_data.action.fcurves:
             if curve.data_path == "location":
                 curves[curve.array_index] = curve.keyframe_points
-        curves = [curves[index] for index in range(len(curves))]
+        curves = [curves[index] for index in range(2)]
 
         for index in reversed(range(len(curves[0]))):
             loc_keyed = tuple(round(keyframes[index].co[1]) for keyframes in curves)
-            if all(a == b for a, b in zip(loc_keyed, loc)):
-                return False
-            if all(a == b for a, b in zip(loc_keyed, start_loc)):
+            path.add(loc_keyed)
+            if loc_keyed == start_loc:
                 break
-        return True
+        return path
 
     def action_to_delta(self, context, obj, action):
-        step = 1 * (-1 + bool(not Board.get_color(context, obj)) * 2)
-        nd = divmod(self.move_names.index(action), 3)
-        return tuple(comp * step for comp in (nd[1] - 1, nd[0] - 1, 0))
-
-    def delta_to_action(self, context, obj, delta):
-        step = 1 * (-1 + bool(Board.get_color(context, obj)) * 2)
-        delta = tuple(comp // step + 1 for comp in delta)
-        return self.move_names[delta[1] * 3 + delta[0]]
-
-    def is_in_move_set(self, action):
-        return action in self.move_set
-
-    def capture(self, context, obj, op):
-        collider = Board.intersect_board(context, obj)
-        if collider is not None:
-            collider.keyframe_insert(data_path='location',
-                                     frame=bpy.context.scene.frame_current - 1)
-            collider.location = (0, 9 if Board.get_color(context, collider) else -2,
-                                 collider.location.z)
-            collider.keyframe_insert(data_path='location')
-            Board.intersect_out(context, collider)
-            Board.end(context, obj, collider, op)
+        return engine.action_to_delta(Board.get_color(context, obj), action) + (0,)
 
+    def capture(self, context, obj, op, state, captured):
+        if captured is None:
+            return
+        piece = state.pieces[captured]
+        collider = Board.get_object(context, state, captured)
+        self.keys.add(collider, 'location', bpy.context.scene.frame_current - 1)
+        collider.location = (piece.slot, engine.tray_ranks[piece.color], collider.location.z)
+        self.keys.add(collider, 'location')
+        Board.end(context, obj, collider, op)
 
-class King(Piece):
-    move_set = Piece.move_names
 
-    def poll_action(self, context, obj=None, obj_loc=None, action=None):
-        if obj is None:
-            obj = context.active_object
-
-        loc = super().poll_action(context, obj, obj_loc, action)
-        if loc is None:
-            return False
-        collider = Board.intersect_board(context, obj, loc)
-        if collider is None:
-            return True
-        if Board.get_color(context, obj) == Board.get_color(context, collider):
-            return False
-        return not Board.get_type(collider) == "Rook"
+class King(Piece):
+    pass
 
 
 class Rook(Piece):
-    move_set = Piece.move_names_straight
-
-    def poll_action(self, context, obj=None, obj_loc=None, action=None):
-        loc = super().poll_action(context, obj, obj_loc, action)
-        if loc is None:
-            return False
-        collider = Board.intersect_board(context, obj, loc)
-        return collider is None
+    pass
 
 
 class Dice(Piece):
-    move_set = Piece.move_names_straight
-    rot_names = ('BACKWARD', 'FORWARD', 'RIGHT', 'LEFT')
-    chirality = True
-    value_matrix = tuple((n - (3 * bool(n >= 3))) * 2 + bool(n < 3)
-            for n in (reversed(range(7)) if chirality else range(7)))
+    value_matrix = engine.value_matrix
 
     up = mathutils.Vector((0, 0, 1))
 
@@ -540,65 +832,53 @@ class Dice(Piece):
             obj["start"] = obj["value"]
             obj["counter"] = obj["value"]
             obj["start_loc"] = obj.location
+            obj["path"] = self.path_to_prop({tuple(map(round, obj.location[:2]))})
 
     def reset(self, obj):
         obj["value"] = self.rotation_to_value(obj.rotation_euler)
         obj["start"] = obj["value"]
         obj["counter"] = obj["value"]
         obj["start_loc"] = obj.location
+        obj["path"] = self.path_to_prop({tuple(map(round, obj.location[:2]))})
 
-    def poll_action(self, context, obj=None, obj_loc=None, action=None):
-        if obj is None:
-            obj = context.active_object
-
-        loc = super().poll_action(context, obj, obj_loc, action)
-        if loc is None:
-            return False
-        collider = Board.intersect_board(context, obj, loc)
-        if collider is None:
-            return not (self is not None and not self.is_on_path(obj, loc))
-        if Board.get_color(context, obj) == Board.get_color(context, collider):
-            return False
-        return obj["counter"] == 1 and not Board.get_type(collider) == "Rook"
-
-    def move_start(self, op, context, action):
-        super().move_start(op, context, action)
-
-        obj = context.active_object
-        step = 90
-        nd = divmod(self.rot_names.index(action), 2)
-        delta = (-1 + nd[1] * 2) * math.radians(step)
-        bpy.ops.transform.rotate(value=delta * (-1 + bool(not Board.get_color(context, obj)) * 2),
-                                 orient_axis=('X', 'Y')[nd[0]], orient_type='GLOBAL')
-        obj["value"] = self.rotation_to_value(obj.rotation_euler)
-        obj["counter"] -= 1
-
-    def move_end(self, op, context):
-        obj = context.active_object
-        context.scene.rdc_game_prev_active = obj.name
-        if obj["counter"] == 0:
-            self.capture(context, obj, op)
-            self.flip(context, obj)
-            self.reset(obj)
-        obj.keyframe_insert(data_path='location')
-        obj.keyframe_insert(data_path='rotation_euler')
-
-    def flip(self, context, obj):
-        if bpy.context.scene.do_flip is False:
-            return
-        if obj["start"] == obj["value"]:
-            bpy.ops.transform.rotate(value=math.radians(180) *
-                                     (-1 + bool(not Board.get_color(context, obj)) * 2),
-                                     orient_axis='X', orient_type='GLOBAL')
-
-    def rotation_to_value(self, rotation):
+    @staticmethod
+    def path_to_prop(path):
+        # squares visited by the current roll as indices
+        return [x * 8 + y for x, y in sorted(path)]
+
+    def to_state(self, obj, color):
+        piece = super().to_state(obj, color)
+        piece.orientation = self.rotation_to_orientation(obj.rotation_euler)
+        if piece.square is not None and piece.counter != piece.start:
+            path = obj.get("path")
+            # files saved before the path was kept fall back to the keyframes
+            piece.path = (set(divmod(square, 8) for square in path)
+                          if path is not None else self.get_path(obj))
+        return piece
+
+    def sync(self, obj, piece):
+        super().sync(obj, piece)
+        obj["path"] = self.path_to_prop(piece.path)
+        # compatible to the previous rotation so the keyed roll interpolates by a quarter turn
+        matrix = mathutils.Matrix(engine.orientation_matrix(piece.orientation))
+        obj.rotation_euler = matrix.to_euler(obj.rotation_euler.order, obj.rotation_euler)
+
+    def move_end(self, op, context, state, index, captured):
+        super().move_end(op, context, state, index, captured)
+        piece = state.pieces[index]
+        if piece.counter == piece.start:
+            self.obj["start_loc"] = self.obj.location
+
+    def rotation_to_value(self, rotation, direction=None):
         quat = rotation.to_quaternion()
         quat.invert()
-        vec = self.up.copy()
+        vec = self.up.copy() if direction is None else mathutils.Vector(direction)
         vec.rotate(quat)
-        vec = tuple(round(comp) for comp in vec)
-        index = sum(comp * (index + 1) + 1 for index, comp in enumerate(vec))
-        return self.value_matrix[index]
+        return engine.axis_to_value(tuple(round(comp) for comp in vec))
+
+    def rotation_to_orientation(self, rotation):
+        return engine.faces_to_orientation(self.rotation_to_value(rotation, direction)
+                                           for direction in engine.directions)
 
     def value_to_rotation(self, value):
         index = self.value_matrix.index(value)
@@ -609,11 +889,11 @@ class Dice(Piece):
         vec[nd[1]] = (-1 + nd[0] * 2)
         return vec.rotation_difference(self.up).to_euler()
 
-    def randomize(self, obj):
+    def randomize(self, obj, keys):
         obj.rotation_euler = self.value_to_rotation(random.randint(1, 6))
         obj.rotation_euler.z = math.radians(90) * random.randint(1, 4)
-        obj.keyframe_insert(data_path='location')
-        obj.keyframe_insert(data_path='rotation_euler')
+        keys.add(obj, 'location')
+        keys.add(obj, 'rotation_euler')
         self.init(obj)
 
 
@@ -626,29 +906,14 @@ class Queen(Dice):
         super().reset(obj)
         obj["shared"] = False
 
-    def poll_action(self, context, obj=None, obj_loc=None, action=None):
-        if obj is None:
-            obj = context.active_object
+    def to_state(self, obj, color):
+        piece = super().to_state(obj, color)
+        piece.shared = bool(obj.get("shared", False))
+        return piece
 
-        loc = super(Dice, self).poll_action(context, obj, obj_loc, action)
-        if loc is None:
-            return False
-        collider = Board.intersect_board(context, obj, loc)
-        if collider is None:
-            return not (self is not None and not self.is_on_path(obj, loc))
-        if obj["shared"] and obj["counter"] > 1:
-            return False
-        if Board.get_color(context, obj) == Board.get_color(context, collider):
-            return bool(obj["counter"] > 1)
-
-        return not Board.get_type(collider) == "Rook"
-
-    def move_end(self, op, context):
-        obj = context.active_object
-        collider = Board.intersect_board(context, obj)
-        if collider is not None:
-            obj["shared"] = True
-        super().move_end(op, context)
+    def sync(self, obj, piece):
+        super().sync(obj, piece)
+        obj["shared"] = piece.shared
 
 
 def get_use_queen(self):
@@ -658,16 +923,35 @@ def set_use_queen(self, value):
     Board.setup = Board.setup[:4] + ("D", "Q")[value] + Board.setup[5:]
 
 
+fuzzy_cache = {}
+fuzzy_counts = [0, 0]
+
+
 def get_fuzzy(context, name, parent=None):
     if parent is None:
         parent = context.scene.collection
+    key = (parent.as_pointer(), name)
+    found = fuzzy_cache.get(key)
+    if found is not None:
+        try:
+            if found.name.startswith(name):
+                return found
+        except ReferenceError:
+            pass
+
+    found = None
     for coll in parent.children_recursive:
         if coll.name.startswith(name):
-            return coll
-
-    for obj in parent.all_objects:
-        if obj.name.startswith(name):
-            return obj
+            found = coll
+            break
+    else:
+        for obj in parent.all_objects:
+            if obj.name.startswith(name):
+                found = obj
+                break
+    if found is not None:
+        fuzzy_cache[key] = found
+    return found
 
 
 class VIEW3D_OT_rdc_set_view(Operator):
@@ -725,14 +1009,50 @@ classes = (
     RDC_OT_board,
     RDC_OT_board_history,
     RDC_OT_move_piece,
+    RDC_OT_computer_move,
     VIEW3D_OT_rdc_set_view,
 )
 
 _register, _unregister = bpy.utils.register_classes_factory(classes)
 
 
+@persistent
+def clear_caches(*args):
+    game_states.clear()
+    histories.clear()
+    panel_cache.clear()
+    instr_cache.clear()
+    fuzzy_cache.clear()
+    engine.playable_table.clear()
+
+
+@persistent
+def frame_changed(scene, *args):
+    bump_version(scene)
+
+
+@persistent
+def check_datablocks(scene, depsgraph):
+    # added, removed or renamed collections and objects can change what get_fuzzy resolves
+    counts = [len(bpy.data.objects), len(bpy.data.collections)]
+    if counts != fuzzy_counts or depsgraph.id_type_updated('COLLECTION'):
+        fuzzy_counts[:] = counts
+        fuzzy_cache.clear()
+
+
+state_handlers = (
+    bpy.app.handlers.undo_post,
+    bpy.app.handlers.redo_post,
+    bpy.app.handlers.load_post,
+)
+
+
 def register():
     _register()
+    for handlers in state_handlers:
+        handlers.append(clear_caches)
+    bpy.app.handlers.depsgraph_update_post.append(check_datablocks)
+    bpy.app.handlers.frame_change_post.append(frame_changed)
     Scene.rdc_game_current_frame = IntProperty(
             name='rdc_game_current_frame',
             description='Last frame with keys',
@@ -745,5 +1065,16 @@ def register():
 
 def unregister():
     _unregister()
+    for handlers in state_handlers:
+        if clear_caches in handlers:
+            handlers.remove(clear_caches)
+    if check_datablocks in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(check_datablocks)
+    if frame_changed in bpy.app.handlers.frame_change_post:
+        bpy.app.handlers.frame_change_post.remove(frame_changed)
+    clear_caches()
+    for pool in rollout_pools.values():
+        pool.shutdown(wait=False, cancel_futures=True)
+    rollout_pools.clear()
     del Scene.rdc_game_current_frame
     del Scene.rdc_game_prev_active
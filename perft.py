@@ -0,0 +1,151 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# Perft benchmark and correctness check of the move generation, free of bpy.
+# Run from the directory containing the add-on, e.g.
+#   python -m dice_chess.perft
+# Counts the leaves of the tree of single steps, as offered by the move pad,
+# and of complete moves and compares them with the expected counts below.
+
+import argparse
+import sys
+import time
+
+from . import engine
+
+
+no_queen_setup = engine.setup[:4] + "D" + engine.setup[5:]
+
+# name: (setup, do_flip, randomize seed, depths differing from the default)
+# with all dice showing one no flip or pass through happens, a flip only changes the count
+# once the flipped dice moves again, from the third complete move on
+positions = {
+    "random 1": (engine.setup, False, 1, {}),
+    "random 1 no queen": (no_queen_setup, False, 1, {}),
+    "random 3": (engine.setup, False, 3, {"moves": 3}),
+    "random 3 flip": (engine.setup, True, 3, {"moves": 3}),
+    "random 3 no queen": (no_queen_setup, False, 3, {"moves": 3}),
+    "random 3 no queen flip": (no_queen_setup, True, 3, {"moves": 3}),
+}
+
+# (position, variant without a rule, mode): equal counts mean the rule isn't reached
+variants = (
+    ("random 1", "random 1 no queen", "steps"),
+    ("random 1", "random 1 no queen", "moves"),
+    ("random 3 flip", "random 3", "moves"),
+    ("random 3 no queen flip", "random 3 no queen", "moves"),
+    ("random 3", "random 3 no queen", "steps"),
+    ("random 3", "random 3 no queen", "moves"),
+)
+
+# (position, mode, depth): leaf count
+expected = {
+    ("random 1", "steps", 4): 5682,
+    ("random 1", "moves", 2): 22923,
+    ("random 1 no queen", "steps", 4): 4644,
+    ("random 1 no queen", "moves", 2): 10693,
+    ("random 3", "steps", 4): 5492,
+    ("random 3", "moves", 3): 621072,
+    ("random 3 flip", "steps", 4): 5492,
+    ("random 3 flip", "moves", 3): 534279,
+    ("random 3 no queen", "steps", 4): 4504,
+    ("random 3 no queen", "moves", 3): 468530,
+    ("random 3 no queen flip", "steps", 4): 4504,
+    ("random 3 no queen flip", "moves", 3): 384772,
+}
+
+
+def new_position(name):
+    setup, do_flip, seed, _ = positions[name]
+    state = engine.GameState.new(setup, do_flip)
+    state.randomize(seed)
+    return state
+
+
+def perft_steps(state, depth):
+    if depth == 0:
+        return 1
+    count = 0
+    for index in range(len(state.pieces)):
+        for action in sorted(state.find_playable(index)):
+            if depth == 1:
+                count += 1
+                continue
+            child = state.copy()
+            child.step(index, action)
+            count += perft_steps(child, depth - 1)
+    return count
+
+
+def perft_moves(state, depth):
+    moves = state.legal_moves(state.side_to_move())
+    if depth == 1:
+        return len(moves)
+    count = 0
+    for move in moves:
+        child = state.copy()
+        child.play(move)
+        count += perft_moves(child, depth - 1)
+    return count
+
+
+modes = {"steps": perft_steps, "moves": perft_moves}
+depths = {"steps": 4, "moves": 2}
+
+
+def run(names=None, modes_used=None, depth=None, out=sys.stdout):
+    # returns the measured counts keyed like expected and the number of mismatches
+    counts = {}
+    failures = 0
+    total_nodes = 0
+    total_seconds = 0.0
+    for name in names or positions:
+        for mode in modes_used or modes:
+            state = new_position(name)
+            mode_depth = depth or positions[name][3].get(mode, depths[mode])
+            start = time.perf_counter()
+            count = modes[mode](state, mode_depth)
+            seconds = time.perf_counter() - start
+            total_nodes += count
+            total_seconds += seconds
+            key = (name, mode, mode_depth)
+            counts[key] = count
+            known = expected.get(key)
+            if known is None:
+                result = "new"
+            elif known == count:
+                result = "ok"
+            else:
+                result = "FAIL expected {0}".format(known)
+                failures += 1
+            print("{0:<24}{1:<6}{2:>3}{3:>12}{4:>12.0f}/s  {5}".format(
+                  name, mode, mode_depth, count, count / seconds if seconds > 0 else 0, result),
+                  file=out)
+    for name, variant, mode in variants:
+        for key, count in counts.items():
+            if key[:2] == (name, mode) and counts.get((variant,) + key[1:]) == count:
+                print("{0:<24}{1:<6}{2:>3}  FAIL same count as {3}".format(
+                      variant, mode, key[2], name), file=out)
+                failures += 1
+    print("total {0} leaves, {1:.0f} leaves/s, {2} failures".format(
+          total_nodes, total_nodes / total_seconds if total_seconds > 0 else 0, failures), file=out)
+    return counts, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Count leaves of the move generation tree")
+    parser.add_argument("--position", action="append", choices=list(positions))
+    parser.add_argument("--mode", action="append", choices=list(modes))
+    parser.add_argument("--depth", type=int, default=None)
+    parser.add_argument("--print-expected", action="store_true",
+                        help="print the measured counts in the form of the expected table")
+    args = parser.parse_args(argv)
+
+    counts, failures = run(args.position, args.mode, args.depth)
+    if args.print_expected:
+        for key, count in counts.items():
+            print("    {0!r}: {1},".format(key, count))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import bpy
+from bpy.props import BoolProperty
+from bpy.types import Operator, Scene
+
+from . import keymaps
+from . import main
+
+
+template_name = ".Dice Chess Template"
+
+
+def link_scene(source, target, exclude=None):
+    # the static board, light and piece types are shared by all game scenes
+    for obj in source.collection.objects:
+        target.collection.objects.link(obj)
+    for child in source.collection.children:
+        if child != exclude:
+            target.collection.children.link(child)
+    target.world = source.world
+    target.render.engine = source.render.engine
+    target.rdc_game_ground_ref = source.rdc_game_ground_ref
+    target.rdc_game_light_ref = source.rdc_game_light_ref
+
+
+class RDC_OT_new(Operator):
+    bl_idname = 'rdc_game.new'
+    bl_label = 'New Game'
+    bl_description = 'Create and init new game scene'
+
+    def execute(self, context):
+        template = bpy.data.scenes.get(template_name)
+        if template is not None:
+            if main.get_fuzzy(context, "Types", template.collection) is not None:
+                return self.clone(context, template)
+            bpy.data.scenes.remove(template)
+
+        wm = context.window_manager
+        progress = 0
+        wm.progress_begin(progress, 10)
+        progress += 1
+        wm.progress_update(progress)
+        bpy.ops.scene.new(type='NEW')
+        bpy.context.scene.name = "Dice Chess"
+        progress += 1
+        wm.progress_update(progress)
+        bpy.ops.rdc_game.builder(action='SCENE')
+        progress += 4
+        bpy.ops.rdc_game.board(action='RESET')
+        progress += 1
+        wm.progress_update(progress)
+        bpy.ops.rdc_game.ui()
+        progress += 1
+        wm.progress_update(progress)
+        keymaps.register_keymap()
+        progress += 1
+        wm.progress_update(progress)
+        bpy.ops.rdc_game.set_view(action='RANDOM')
+        context.scene.rdc_game_is_setup = True
+        # kept out of sight for the next New Game
+        template = bpy.data.scenes.new(template_name)
+        link_scene(context.scene, template, main.get_fuzzy(context, "Pieces"))
+        wm.progress_end()
+        return {'FINISHED'}
+
+    def clone(self, context, template):
+        scene = bpy.data.scenes.new("Dice Chess")
+        link_scene(template, scene)
+        context.window.scene = scene
+        # fresh pieces share the meshes of the types and start without animation
+        bpy.ops.rdc_game.board(action='RESET')
+        if len(keymaps.addon_keymaps) == 0:
+            keymaps.register_keymap()
+        bpy.ops.rdc_game.set_view(action='RANDOM')
+        scene.rdc_game_is_setup = True
+        return {'FINISHED'}
+
+
+classes = (
+    RDC_OT_new,
+)
+
+_register, _unregister = bpy.utils.register_classes_factory(classes)
+
+def register():
+    _register()
+    Scene.rdc_game_is_setup = BoolProperty(
+        name='is_setup',
+        default=False
+        )
+
+
+def unregister():
+    _unregister()
+    del Scene.rdc_game_is_setup
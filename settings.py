@@ -5,8 +5,10 @@ import random
 import bpy
 from bpy.props import (
             BoolProperty,
+            EnumProperty,
             FloatProperty,
             FloatVectorProperty,
+            IntProperty,
             StringProperty,
             )
 from bpy.types import (
@@ -38,6 +40,15 @@ class RDC_PT_settings(Panel):
         row = layout.row()
         row.prop(context.scene, "with_queen", text="With Queen")
 
+        layout.row().label(text='Computer:')
+        row = layout.row()
+        row.prop(context.scene, "rdc_game_engine", expand=True)
+        row = layout.row()
+        row.prop(context.scene, "rdc_game_time_budget", text="Time per Move")
+        if context.scene.rdc_game_engine == 'MONTE_CARLO':
+            row = layout.row()
+            row.prop(context.scene, "rdc_game_rollouts", text="Rollouts")
+
         layout.row().separator()
 
         # release/scripts/startup/bl_ui/space_view3d
@@ -147,6 +158,26 @@ def register():
         get=get_use_queen, set=set_use_queen
         )
 
+    Scene.rdc_game_time_budget = FloatProperty(
+        name='rdc_game_time_budget',
+        description='Seconds the computer may think per move',
+        default=1.0, min=0.05, max=60,
+        )
+    Scene.rdc_game_engine = EnumProperty(
+        name='rdc_game_engine',
+        description='Search used by the computer',
+        items=[
+            ('ALPHA_BETA', 'Alpha-Beta', 'Alpha-beta search'),
+            ('MONTE_CARLO', 'Monte Carlo', 'Monte Carlo tree search with parallel random rollouts'),
+        ],
+        default='ALPHA_BETA',
+        )
+    Scene.rdc_game_rollouts = IntProperty(
+        name='rdc_game_rollouts',
+        description='Maximum random games the Monte Carlo search plays per move',
+        default=2000, min=10, max=1000000,
+        )
+
     Scene.rdc_game_ground_ref = StringProperty()
     Scene.background_color = FloatVectorProperty(
         name='rdc_game_background_color',
@@ -175,3 +206,6 @@ def unregister():
     del Scene.seed
     del Scene.do_flip
     del Scene.with_queen
+    del Scene.rdc_game_time_budget
+    del Scene.rdc_game_engine
+    del Scene.rdc_game_rollouts
@@ -0,0 +1,175 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+# Self-play batch simulator, free of bpy.
+# Run from the directory containing the add-on, e.g.
+#   python -m dice_chess.simulate --games 200 --white alpha_beta:0.1 --black random
+
+import argparse
+import concurrent.futures
+import json
+import math
+import os
+import random
+import sys
+
+from . import engine
+from .computer import AlphaBeta, MonteCarlo
+
+
+players = ("random", "alpha_beta", "monte_carlo")
+
+
+def parse_player(spec):
+    # "name" or "name:seconds"
+    name, _, budget = spec.partition(":")
+    if name not in players:
+        raise ValueError("Unknown player {0!r}, use one of {1}".format(name, ", ".join(players)))
+    return name, float(budget) if budget else 0.1
+
+
+def new_setup(with_queen=True):
+    return engine.setup[:4] + ("D", "Q")[with_queen] + engine.setup[5:]
+
+
+def choose(player, state, color, rand, seed):
+    name, budget = player
+    if name == "alpha_beta":
+        return AlphaBeta(time_budget=budget).best_move(state, color)
+    if name == "monte_carlo":
+        # already inside a worker, rollouts stay in process
+        return MonteCarlo(rollouts=1 << 30, time_budget=budget, seed=seed, workers=0).best_move(state, color)
+    moves = state.legal_moves(color)
+    return rand.choice(moves) if moves else None
+
+
+def play_game(game, seed, players, with_queen=True, do_flip=False, max_plies=300):
+    # players indexed by color, returns a json serializable result
+    game_seed = "{0}:{1}".format(seed, game)
+    rand = random.Random(game_seed)
+    state = engine.GameState.new(new_setup(with_queen), do_flip)
+    start_color = state.randomize(game_seed)
+    sums = state.sum_up()
+    captures = [0, 0]
+    plies = 0
+    color = start_color
+    while state.winner is None and plies < max_plies:
+        move = choose(players[color], state, color, rand, "{0}:{1}".format(game_seed, plies))
+        if move is None:
+            break
+        if state.play(move) is not None:
+            captures[color] += 1
+        plies += 1
+        color = state.side_to_move()
+    return {
+        "game": game,
+        "seed": game_seed,
+        "start_color": start_color,
+        "sums": sums,
+        "winner": state.winner,
+        "plies": plies,
+        "captures": captures,
+    }
+
+
+def simulate(games, seed=None, players=(("random", 0), ("random", 0)), with_queen=True,
+             do_flip=False, max_plies=300, workers=None):
+    # yields results in order of completion
+    if seed is None:
+        seed = random.randrange(1 << 32)
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    if workers <= 1:
+        for game in range(games):
+            yield play_game(game, seed, players, with_queen, do_flip, max_plies)
+        return
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(play_game, game, seed, players, with_queen, do_flip, max_plies)
+                   for game in range(games)]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+
+def wilson_interval(hits, count, z=1.96):
+    if count == 0:
+        return 0.0, 1.0
+    rate = hits / count
+    center = (rate + z * z / (2 * count)) / (1 + z * z / count)
+    margin = z * math.sqrt(rate * (1 - rate) / count + z * z / (4 * count * count)) / (1 + z * z / count)
+    return max(center - margin, 0.0), min(center + margin, 1.0)
+
+
+def mean_interval(values, z=1.96):
+    if not values:
+        return 0.0, 0.0, 0.0
+    mean = sum(values) / len(values)
+    if len(values) < 2:
+        return mean, mean, mean
+    deviation = math.sqrt(sum((value - mean) ** 2 for value in values) / (len(values) - 1))
+    margin = z * deviation / math.sqrt(len(values))
+    return mean, mean - margin, mean + margin
+
+
+class Statistics():
+    def __init__(self):
+        self.results = []
+
+    def add(self, result):
+        self.results.append(result)
+
+    def rate(self, test):
+        hits = sum(1 for result in self.results if test(result))
+        count = len(self.results)
+        low, high = wilson_interval(hits, count)
+        return hits / count if count else 0.0, low, high
+
+    def summary(self):
+        decided = [result for result in self.results if result["winner"] is not None]
+        hits = sum(1 for result in decided if result["winner"] == result["start_color"])
+        return {
+            "games": len(self.results),
+            "white wins": self.rate(lambda result: result["winner"] is True),
+            "black wins": self.rate(lambda result: result["winner"] is False),
+            "draws": self.rate(lambda result: result["winner"] is None),
+            "starter wins": self.rate(lambda result: result["winner"] == result["start_color"]),
+            "starter decided": (hits / len(decided) if decided else 0.0,
+                                *wilson_interval(hits, len(decided))),
+            "plies": mean_interval([result["plies"] for result in self.results]),
+            "white captures": mean_interval([result["captures"][1] for result in self.results]),
+            "black captures": mean_interval([result["captures"][0] for result in self.results]),
+        }
+
+    def report(self, out=sys.stdout):
+        summary = self.summary()
+        print("{0:<16}{1}".format("games", summary.pop("games")), file=out)
+        for key, value in summary.items():
+            if key == "plies" or key.endswith("captures"):
+                form = "{0:<16}{1:7.2f} [{2:.2f}, {3:.2f}]"
+            else:
+                form = "{0:<16}{1:7.1%} [{2:.1%}, {3:.1%}]"
+            print(form.format(key, *value), file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play Rolling Dice Chess games between computer players")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--seed", default=None)
+    parser.add_argument("--white", default="random", help="player name[:seconds per move]")
+    parser.add_argument("--black", default="random", help="player name[:seconds per move]")
+    parser.add_argument("--no-queen", action="store_true")
+    parser.add_argument("--flip", action="store_true")
+    parser.add_argument("--max-plies", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--quiet", action="store_true", help="don't stream per game results")
+    args = parser.parse_args(argv)
+
+    players = (parse_player(args.black), parse_player(args.white))
+    statistics = Statistics()
+    for result in simulate(args.games, args.seed, players, not args.no_queen, args.flip,
+                           args.max_plies, args.workers):
+        statistics.add(result)
+        if not args.quiet:
+            print(json.dumps(result), flush=True)
+    statistics.report()
+
+
+if __name__ == '__main__':
+    main()